@@ -1,18 +1,30 @@
-import pandas as pd
 import sys
 from pathlib import Path
 
+# Anzahl Zeilen, die je Blatt gelesen werden: Zeile 1 (Anzahl in B1), Zeile 2 (Spaltenbezeichner), Beispielwerte
+PREVIEW_ROWS = 5
+
 def analyze_excel(excel_file):
     """
     Analysiert eine Excel-Datei und gibt alle Blätter und Spalten zurück
+    
+    Die Datei wird mit openpyxl im read-only-Modus geöffnet und je Blatt werden nur die ersten
+    Zeilen gelesen. Zeilen- und Spaltenzahl stammen aus den Metadaten des Blatts (Dimension),
+    die Zellen der übrigen Zeilen werden nicht geparst.
     """
+    from openpyxl import load_workbook
+    from functions import parse_messages_count
+
     try:
-        # Excel-Datei einlesen
+        # Excel-Datei öffnen, ohne die Blätter vollständig einzulesen
         print(f"Lese Excel-Datei: {excel_file}")
-        excel = pd.ExcelFile(excel_file)
-        
+        workbook = load_workbook(excel_file, read_only=True, data_only=True)
+    except Exception as e:
+        return f"Fehler beim Analysieren der Excel-Datei: {str(e)}"
+
+    try:
         # Alle Blätter (Sheets) auflisten
-        sheets = excel.sheet_names
+        sheets = workbook.sheetnames
         print(f"Gefundene Blätter: {sheets}")
         
         result = []
@@ -22,54 +34,51 @@ def analyze_excel(excel_file):
         # Für jedes Blatt die Spalten auflisten
         for sheet in sheets:
             print(f"Analysiere Blatt: {sheet}")
-            # Lese die ersten beiden Zeilen separat
-            df_header = pd.read_excel(excel_file, sheet_name=sheet, nrows=2)
+            worksheet = workbook[sheet]
+            rows = [list(row) for row in worksheet.iter_rows(max_row=PREVIEW_ROWS, values_only=True)]
+            first_row = rows[0] if rows else []
+            second_row = rows[1] if len(rows) > 1 else []
             
-            # Lese die gesamte Tabelle für die Datenanalyse
-            df = pd.read_excel(excel_file, sheet_name=sheet)
+            # Dimension aus den Metadaten des Blatts, ohne die Zellen zu lesen
+            max_row, max_column = worksheet.max_row, worksheet.max_column
             
             # Prüfe, ob die zweite Zeile die tatsächlichen Spaltenbezeichner enthält
-            has_header_in_second_row = False
-            if len(df) >= 2:
-                # Extrahiere die zweite Zeile als potenzielle Spaltenbezeichner
-                second_row = df.iloc[1].tolist()
-                if any(isinstance(val, str) for val in second_row if pd.notna(val)):
-                    has_header_in_second_row = True
-            
-            # Spaltenüberschriften aus der ersten Zeile
-            columns = df.columns.tolist()
+            has_header_in_second_row = any(isinstance(val, str) and val.strip() for val in second_row)
             
             result.append(f"\nBlatt: {sheet}")
             result.append("-" * 30)
-            result.append(f"Anzahl Zeilen: {len(df)}")
-            result.append(f"Anzahl Spalten: {len(columns)}")
+            if max_row is None or max_column is None:
+                result.append("Dimension: unbekannt (im Blatt nicht gespeichert)")
+            else:
+                result.append(f"Dimension: {worksheet.calculate_dimension()}")
+                result.append(f"Anzahl Zeilen: {max_row}")
+                if has_header_in_second_row:
+                    result.append(f"Anzahl Datenzeilen (ab Zeile 3): {max(max_row - 2, 0)}")
+                result.append(f"Anzahl Spalten: {max_column}")
+            
+            messages_count = parse_messages_count(first_row[1] if len(first_row) > 1 else None)
+            if messages_count:
+                result.append(f"Anzahl Nachrichten (aus B1): {messages_count}")
             
-            # Wenn Spaltenbezeichner in der zweiten Zeile sind
+            # Spaltenbezeichner aus Zeile 2, sonst aus Zeile 1
             if has_header_in_second_row:
                 result.append("\nHinweis: Spaltenbezeichner wurden in der zweiten Zeile gefunden!")
-                result.append("\nSpaltenbezeichner (aus zweiter Zeile):")
-                second_row_headers = df.iloc[0].tolist()
-                for i, header in enumerate(second_row_headers):
-                    if pd.isna(header):
-                        header = f"[Leer {i+1}]"
-                    result.append(f"{i+1}. {header}")
+                headers, samples = second_row, rows[2:]
+            else:
+                headers, samples = first_row, rows[1:]
             
             result.append("\nSpalten (mit Original-Namen):")
             
             # Füge jede Spalte mit Beispielwerten hinzu
-            for i, col in enumerate(columns):
-                # Versuche, einen nicht-leeren Beispielwert zu finden
-                # Überspringe die ersten beiden Zeilen, da diese Header sein könnten
-                if len(df) > 2:
-                    sample_values = df.iloc[2:][col].dropna().head(3).tolist()
-                else:
-                    sample_values = df[col].dropna().head(3).tolist()
-                    
+            for i, header in enumerate(headers):
+                if header is None or (isinstance(header, str) and not header.strip()):
+                    header = f"[Leer {i+1}]"
+                sample_values = [row[i] for row in samples if i < len(row) and row[i] is not None][:3]
                 sample_str = ", ".join([str(val) for val in sample_values])
                 if len(sample_str) > 100:
                     sample_str = sample_str[:97] + "..."
                 
-                result.append(f"{i+1}. {col} - Beispielwerte: {sample_str}")
+                result.append(f"{i+1}. {header} - Beispielwerte: {sample_str}")
             
             # Füge eine Leerzeile für bessere Lesbarkeit hinzu
             result.append("")
@@ -78,6 +87,8 @@ def analyze_excel(excel_file):
         
     except Exception as e:
         return f"Fehler beim Analysieren der Excel-Datei: {str(e)}"
+    finally:
+        workbook.close()
 
 if __name__ == "__main__":
     # Prüfe, ob ein Dateiname als Argument übergeben wurde
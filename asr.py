@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Genauigkeit der Whisper-Gewichte auf der CPU: int8 quantisiert die Linear-Schichten dynamisch
+# (Gewichte int8, Aktivierungen zur Laufzeit), fp32 ist das unveränderte Modell
+PRECISIONS = ("int8", "fp32")
+WHISPER_MODELS = ('tiny', 'base', 'small', 'medium', 'large')
+SAMPLE_RATE = 16000  # whisper.audio.SAMPLE_RATE
+
+# Geladene Modelle je (Name, Genauigkeit), prozessweit: der Report-Server lädt jedes Modell nur einmal
+_models = {}
+_models_lock = threading.Lock()
+
+def quantize_linear_layers(model):
+    """
+    Ersetzt alle Linear-Schichten durch dynamisch int8-quantisierte (torch.ao.quantization.quantize_dynamic).
+    Whisper verwendet eine eigene Linear-Unterklasse, die nur für fp16 die Gewichte umwandelt;
+    quantize_dynamic erkennt nur torch.nn.Linear, deshalb werden sie vorher zurückgestuft.
+    """
+    import torch
+
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_model(model_name, precision="int8"):
+    """
+    Lädt ein Whisper-Modell für die CPU (aus dem Prozess-Cache, falls schon geladen).
+    Liefert (modell, tatsächliche genauigkeit, sperre); schlägt die Quantisierung fehl, wird fp32 verwendet.
+    """
+    import whisper
+
+    with _models_lock:
+        key = (model_name, precision)
+        if key in _models:
+            return _models[key]
+        model = whisper.load_model(model_name, device="cpu")
+        model.eval()
+        actual = "fp32"
+        if precision == "int8":
+            try:
+                model = quantize_linear_layers(model)
+                actual = "int8"
+            except Exception as e:
+                print(f"Warnung: int8-Quantisierung nicht möglich ({e}), verwende fp32")
+        # Dekodieren hängt Hooks an die Schichten, ein Modell transkribiert daher immer nur eine Datei
+        entry = (model, actual, threading.Lock())
+        _models[key] = entry
+        if actual != precision:
+            _models[(model_name, actual)] = entry
+        return entry
+
+class WhisperTranscriber:
+    """
+    Spracherkennung mit Whisper auf der CPU. Das Modell wird erst beim ersten Aufruf geladen.
+    `precision` 'int8' quantisiert die Linear-Schichten (deutlich schneller, geringfügig ungenauer),
+    `threads` legt die Anzahl Torch-Threads fest (torch.set_num_threads gilt für den ganzen Prozess).
+    Scheitert die Erkennung mit dem quantisierten Modell, wird die Datei mit fp32 wiederholt.
+    """
+    def __init__(self, model_name="small", precision="int8", threads=None, language=None):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unbekannte Genauigkeit: {precision} (erlaubt: {', '.join(PRECISIONS)})")
+        self.model_name = model_name
+        self.precision = precision
+        self.threads = threads
+        self.language = language
+
+    def describe(self):
+        threads = f", {self.threads} Threads" if self.threads else ""
+        return f"Whisper '{self.model_name}' auf CPU ({self.precision}{threads})"
+
+    def _transcribe_with(self, precision, audio):
+        import torch
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        model, actual, lock = load_model(self.model_name, precision)
+        self.precision = actual if precision == self.precision else self.precision
+        with lock, torch.inference_mode():
+            result = model.transcribe(audio, fp16=False, language=self.language)
+        return result.get("text", "").strip()
+
+    def transcribe(self, path):
+        """
+        Text einer Audio- oder Videodatei (Whisper dekodiert über ffmpeg), None bei Fehlern.
+        Die Datei wird nur einmal dekodiert; nicht lesbare Dateien werden nicht mit fp32 wiederholt.
+        """
+        try:
+            import whisper
+            audio = whisper.load_audio(str(path))
+        except ImportError as e:
+            print(f"Fehler: Whisper/Torch nicht installiert ({e})")
+            return None
+        except Exception as e:
+            print(f"Error transcribing {path}: {e}")
+            return None
+        try:
+            return self._transcribe_with(self.precision, audio) or None
+        except ImportError as e:
+            print(f"Fehler: Whisper/Torch nicht installiert ({e})")
+            return None
+        except Exception as e:
+            if self.precision == "fp32":
+                print(f"Error transcribing {path}: {e}")
+                return None
+            print(f"Warnung: int8-Erkennung fehlgeschlagen für {path} ({e}), wiederhole mit fp32")
+        try:
+            return self._transcribe_with("fp32", audio) or None
+        except Exception as e:
+            print(f"Error transcribing {path}: {e}")
+            return None
+
+def word_error_rate(reference, hypothesis):
+    """Wortfehlerrate (Levenshtein über Wörter, ohne Groß-/Kleinschreibung) von `hypothesis` gegenüber `reference`"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+def audio_duration(path):
+    import whisper
+    return len(whisper.load_audio(str(path))) / SAMPLE_RATE
+
+def compare(files, models, precisions=PRECISIONS, threads=None, language=None, references=None):
+    """
+    Transkribiert `files` mit jeder Kombination aus Modell und Genauigkeit und misst Ladezeit,
+    Echtzeitfaktor (Rechenzeit / Audiodauer) und die Wortfehlerrate gegenüber der fp32-Ausgabe
+    desselben Modells sowie, falls vorhanden, gegenüber Referenztexten (`references`: datei -> text).
+    """
+    references = references or {}
+    durations = {path: audio_duration(path) for path in files}
+    results = []
+    for model_name in models:
+        outputs = {}
+        for precision in sorted(precisions, key=lambda p: p != "fp32"):  # fp32 zuerst, als Referenz
+            start = time.perf_counter()
+            _, actual, _ = load_model(model_name, precision)
+            load_time = time.perf_counter() - start
+            transcriber = WhisperTranscriber(model_name, precision, threads, language)
+            compute = 0.0
+            texts = {}
+            for path in files:
+                start = time.perf_counter()
+                texts[path] = transcriber.transcribe(path) or ""
+                compute += time.perf_counter() - start
+            outputs[precision] = texts
+            row = {
+                "model": model_name,
+                "precision": actual,
+                "load_seconds": round(load_time, 2),
+                "audio_seconds": round(sum(durations.values()), 1),
+                "compute_seconds": round(compute, 2),
+                "realtime_factor": round(compute / sum(durations.values()), 3) if sum(durations.values()) else None,
+                "wer_vs_fp32": None,
+                "wer_vs_reference": None,
+            }
+            if "fp32" in outputs and precision != "fp32":
+                row["wer_vs_fp32"] = round(sum(word_error_rate(outputs["fp32"][path], texts[path])
+                                               for path in files) / len(files), 3)
+            known = [path for path in files if path in references]
+            if known:
+                row["wer_vs_reference"] = round(sum(word_error_rate(references[path], texts[path])
+                                                    for path in known) / len(known), 3)
+            results.append(row)
+    return results
+
+def format_comparison(results):
+    def value(number):
+        return "-" if number is None else f"{number:.3f}"
+    lines = ["=== Transkription: Genauigkeit und Geschwindigkeit ===",
+             f"{'Modell':8} {'Genau.':6} {'Laden':>7} {'Rechnen':>9} {'RTF':>7} {'WER/fp32':>9} {'WER/Ref':>8}"]
+    for row in results:
+        lines.append(f"{row['model']:8} {row['precision']:6} {row['load_seconds']:>6.1f}s {row['compute_seconds']:>8.1f}s "
+                     f"{value(row['realtime_factor']):>7} {value(row['wer_vs_fp32']):>9} {value(row['wer_vs_reference']):>8}")
+    lines.append("RTF = Rechenzeit / Audiodauer (kleiner ist schneller), WER = Wortfehlerrate")
+    return "\n".join(lines)
+
+def export_audio_files(excel_file, limit):
+    """Die ersten `limit` vorhandenen Audiodateien eines Exports"""
+    from functions import resolve_attachments
+    from models import AttachmentType, get_reader
+
+    chat = get_reader(excel_file).read(excel_file)
+    resolve_attachments(chat)
+    paths = []
+    for _, msg in chat.iter_attachment_messages():
+        attachment = msg.attachment
+        if attachment.type == AttachmentType.AUDIO and attachment.full_path and str(attachment.full_path) not in paths:
+            paths.append(str(attachment.full_path))
+            if len(paths) >= limit:
+                break
+    return paths
+
+def main():
+    """
+    Kommandozeile: Modelle und Genauigkeiten auf eigenen Audiodateien vergleichen
+    """
+    parser = argparse.ArgumentParser(description='Whisper auf der CPU: int8 und fp32 nach Genauigkeit und Geschwindigkeit vergleichen')
+    parser.add_argument('files', nargs='*', help='Audiodateien; neben einer Datei liegende <name>.txt gilt als Referenztext')
+    parser.add_argument('--excel', help='Stattdessen Audioanhänge dieses Exports verwenden')
+    parser.add_argument('--limit', type=int, default=10, help='Anzahl Audioanhänge aus --excel (Standard: 10)')
+    parser.add_argument('--models', nargs='+', default=['tiny', 'base', 'small'], choices=WHISPER_MODELS,
+                        help='Zu vergleichende Modelle (Standard: tiny base small)')
+    parser.add_argument('--precisions', nargs='+', default=list(PRECISIONS), choices=PRECISIONS,
+                        help='Zu vergleichende Genauigkeiten (Standard: int8 fp32)')
+    parser.add_argument('--threads', type=int, default=None, help='Anzahl Torch-Threads (Standard: automatisch)')
+    parser.add_argument('--language', default=None, help='Sprache, z.B. de (Standard: automatisch erkennen)')
+    parser.add_argument('--output', '-o', help='Ergebnisse zusätzlich als JSON-Datei speichern')
+    args = parser.parse_args()
+
+    files = list(args.files)
+    if args.excel:
+        try:
+            files += export_audio_files(args.excel, args.limit)
+        except ValueError:
+            print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
+            sys.exit(1)
+    if not files:
+        print("Fehler: Keine Audiodateien angegeben (Dateien oder --excel).")
+        sys.exit(1)
+
+    references = {}
+    for path in files:
+        reference = Path(path).with_suffix('.txt')
+        if reference.exists():
+            references[path] = reference.read_text(encoding='utf-8')
+
+    try:
+        results = compare(files, args.models, args.precisions, args.threads, args.language, references)
+    except ImportError as e:
+        print(f"Fehler: Whisper/Torch nicht installiert ({e})")
+        sys.exit(1)
+    print(f"{len(files)} Dateien, {len(references)} mit Referenztext")
+    print(format_comparison(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"files": files, "results": results}, f, indent=2)
+        print(f"Ergebnisse gespeichert: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Spaltenlayout eines PA-Exports (Zeile 2), ergänzt um Füllspalten wie im Original
+EXPORT_COLUMNS = [
+    "#", "From", "To", "Participants", "Source", "Account", "Direction", "Subject", "Body", "Status",
+    "Transcript", "Platform", "Chat #", "Chat - Start", "Chat - End", "Source Info", "Recovered",
+    "Timestamp-Date", "Timestamp-Time", "Location", "Tags", "Notes", "Blocked", "Read", "Delivered",
+    "Attachment #1", "Attachment #1 - Details", "Deleted", "Label", "Starred message"
+]
+
+WORDS = ("hallo wie geht es dir heute morgen treffen wir uns später ok danke gut bis dann "
+         "schon gesehen ich bin unterwegs melde mich gleich kein problem super").split()
+EMOJIS = ["😂", "👍", "❤️", "😊", "🙏", "🎉", "😅", "🔥"]
+
+SYNTHETIC_PARTICIPANTS = [
+    "4915111111111 Max Mustermann",   # Besitzer (ausgehend)
+    "4915122222222 Erika Musterfrau",
+    "4915133333333 Hans Beispiel",
+]
+
+def generate_synthetic_export(out_dir, rows=10000, emoji_density=0.05, attachment_ratio=0.1,
+                              images=50, audio=10, image_size=(800, 600), seed=1):
+    """
+    Erzeugt einen synthetischen PA-Export in `out_dir`: chat.xlsx mit der zweizeiligen Kopfzeile
+    (B1 "Instant Messages (N)", Spaltenbezeichner in Zeile 2) und einen files/-Baum mit
+    `images` Bildern und `audio` Audiodateien, auf die `attachment_ratio` der Nachrichten verweisen.
+    `emoji_density` ist der Anteil der Wörter, denen ein Emoji folgt. Liefert den Pfad der Excel-Datei.
+    """
+    from openpyxl import Workbook
+    from PIL import Image
+
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    image_dir = out_dir / 'files' / 'Image' / 'chat'
+    audio_dir = out_dir / 'files' / 'Audio' / 'chat'
+    image_dir.mkdir(parents=True, exist_ok=True)
+    audio_dir.mkdir(parents=True, exist_ok=True)
+
+    attachments = []
+    for i in range(images):
+        name = f"IMG_{i:05d}.jpg"
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        Image.new('RGB', image_size, color).save(image_dir / name, 'JPEG', quality=85)
+        attachments.append(name)
+    for i in range(audio):
+        name = f"AUD_{i:05d}.mp3"
+        (audio_dir / name).write_bytes(rng.randbytes(16 * 1024))
+        attachments.append(name)
+
+    column = {name: i for i, name in enumerate(EXPORT_COLUMNS)}
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Chats')
+    sheet.append([None, f"Instant Messages ({rows})"])
+    sheet.append(EXPORT_COLUMNS)
+
+    start = datetime(2023, 1, 1, 8, 0, 0)
+    for number in range(1, rows + 1):
+        sender = rng.choice(SYNTHETIC_PARTICIPANTS)
+        words = []
+        for _ in range(rng.randint(1, 25)):
+            words.append(rng.choice(WORDS))
+            if rng.random() < emoji_density:
+                words.append(rng.choice(EMOJIS))
+        timestamp = start + timedelta(seconds=number * 37)
+
+        row = [None] * len(EXPORT_COLUMNS)
+        row[column["#"]] = number
+        row[column["From"]] = sender
+        row[column["Direction"]] = "Outgoing" if sender == SYNTHETIC_PARTICIPANTS[0] else "Incoming"
+        row[column["Body"]] = " ".join(words)
+        row[column["Status"]] = rng.choice(["Read", "Delivered", "Sent"])
+        row[column["Timestamp-Date"]] = timestamp.strftime('%d.%m.%Y')
+        row[column["Timestamp-Time"]] = timestamp.strftime('%d.%m.%Y %H:%M:%S') + "(UTC+0)"
+        if attachments and rng.random() < attachment_ratio:
+            row[column["Attachment #1"]] = rng.choice(attachments)
+        if rng.random() < 0.01:
+            row[column["Deleted"]] = "Yes"
+        if rng.random() < 0.01:
+            row[column["Starred message"]] = "Yes"
+        sheet.append(row)
+
+    excel_path = out_dir / 'chat.xlsx'
+    workbook.save(excel_path)
+    return excel_path
+
+@contextlib.contextmanager
+def stage(results, name):
+    """Misst die Laufzeit eines Abschnitts und trägt sie in `results` ein"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[name] = time.perf_counter() - start
+
+def run_pipeline(excel_path, output_dir, report_format='pdf'):
+    """
+    Durchläuft einmal die komplette Pipeline und liefert die Laufzeiten je Stufe in Sekunden.
+    Layout und Zeichnen erfolgen in ChatReport.add_chat_line in einem Durchgang und werden
+    daher gemeinsam als 'render' gemessen.
+    """
+    from functions import generate_statistics, resolve_attachments
+    from generate_report import create_backend
+    from models import ExcelChatExportReader, UNKNOWN_PARTICIPANT
+
+    results = {}
+    with stage(results, 'excel_read'):
+        chat = ExcelChatExportReader().read(excel_path)
+    with stage(results, 'attachment_resolution'):
+        resolve_attachments(chat)
+    with stage(results, 'statistics'):
+        generate_statistics(chat)
+
+    backend = create_backend(report_format, Path(output_dir) / f"report.{report_format}")
+    with stage(results, 'render_setup'):
+        backend.begin(chat)
+    with stage(results, 'render'):
+        for index, message in enumerate(chat.messages):
+            if message.sender is not UNKNOWN_PARTICIPANT:
+                backend.add_message(index, message)
+    with stage(results, 'save'):
+        backend.finish()
+    results['total'] = sum(results.values())
+    return results
+
+def run_benchmark(excel_path, output_dir, report_format='pdf', repeat=3, quiet=True):
+    """Führt die Pipeline `repeat`-mal aus und liefert je Stufe das Minimum und alle Einzelwerte"""
+    runs = []
+    for _ in range(repeat):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            runs.append(run_pipeline(excel_path, output_dir, report_format))
+    return {
+        name: {"min": min(run[name] for run in runs), "runs": [run[name] for run in runs]}
+        for name in runs[0]
+    }
+
+def compare(results, baseline):
+    """Gibt die Veränderung gegenüber einer früheren Ergebnisdatei je Stufe aus"""
+    print("\n=== Vergleich mit Baseline ===")
+    for name, values in results["stages"].items():
+        if name not in baseline.get("stages", {}):
+            continue
+        before = baseline["stages"][name]["min"]
+        after = values["min"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{name:24} {before:9.3f}s -> {after:9.3f}s  ({change:+.1f}%)")
+
+def main():
+    """
+    Kommandozeile: synthetischen Export erzeugen und die Pipeline je Stufe messen
+    """
+    parser = argparse.ArgumentParser(description='Benchmark der Report-Pipeline mit synthetischen PA-Exporten')
+    parser.add_argument('--dir', default='benchmark_data', help='Verzeichnis für den synthetischen Export (Standard: benchmark_data)')
+    parser.add_argument('--excel', help='Vorhandene Excel-Datei verwenden statt einen Export zu erzeugen')
+    parser.add_argument('--rows', type=int, default=10000, help='Anzahl Nachrichten (Standard: 10000)')
+    parser.add_argument('--emoji-density', type=float, default=0.05, help='Anteil Wörter mit folgendem Emoji (Standard: 0.05)')
+    parser.add_argument('--attachment-ratio', type=float, default=0.1, help='Anteil Nachrichten mit Anhang (Standard: 0.1)')
+    parser.add_argument('--images', type=int, default=50, help='Anzahl Bilder im files/-Baum (Standard: 50)')
+    parser.add_argument('--audio', type=int, default=10, help='Anzahl Audiodateien im files/-Baum (Standard: 10)')
+    parser.add_argument('--seed', type=int, default=1, help='Startwert des Zufallsgenerators (Standard: 1)')
+    parser.add_argument('--format', '-f', dest='report_format', choices=['pdf', 'html', 'jsonl'], default='pdf',
+                        help='Ausgabeformat des Reports (Standard: pdf)')
+    parser.add_argument('--repeat', type=int, default=3, help='Anzahl Durchläufe, gewertet wird das Minimum (Standard: 3)')
+    parser.add_argument('--output', '-o', default='benchmark_results.json', help='Ergebnisdatei (Standard: benchmark_results.json)')
+    parser.add_argument('--baseline', help='Frühere Ergebnisdatei, gegen die verglichen wird')
+    args = parser.parse_args()
+
+    data_dir = Path(args.dir)
+    if args.excel:
+        excel_path = Path(args.excel)
+        data_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        print(f"Erzeuge synthetischen Export mit {args.rows} Nachrichten in {data_dir} ...")
+        start = time.perf_counter()
+        excel_path = generate_synthetic_export(data_dir, args.rows, args.emoji_density, args.attachment_ratio,
+                                               args.images, args.audio, seed=args.seed)
+        print(f"Export erzeugt in {time.perf_counter() - start:.1f}s: {excel_path}")
+
+    try:
+        stages = run_benchmark(excel_path, data_dir, args.report_format, max(1, args.repeat))
+    except ValueError:
+        print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
+        sys.exit(1)
+
+    results = {
+        "date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "excel_file": str(excel_path),
+        "parameters": {"format": args.report_format, "repeat": args.repeat},
+        "stages": stages,
+    }
+    if not args.excel:
+        results["parameters"].update(rows=args.rows, emoji_density=args.emoji_density,
+                                     attachment_ratio=args.attachment_ratio, images=args.images,
+                                     audio=args.audio, seed=args.seed)
+
+    print("\n=== Laufzeiten (Minimum aus {} Durchläufen) ===".format(max(1, args.repeat)))
+    for name, values in stages.items():
+        print(f"{name:24} {values['min']:9.3f}s")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nErgebnisse gespeichert: {args.output}")
+
+if __name__ == "__main__":
+    main()
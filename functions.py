@@ -4,65 +4,102 @@ from pathlib import Path
 import argparse
 from datetime import datetime
 
-def read_excel_file(excel_file):
+from instrumentation import count, timed, timer
+
+def parse_messages_count(messages_count_text):
+    """
+    Extrahiert die Anzahl der Nachrichten aus Zelle B1, z.B. "Instant Messages (1234)"
+    """
+    if isinstance(messages_count_text, str) and "(" in messages_count_text and ")" in messages_count_text:
+        # Extrahiere die Zahl zwischen Klammern
+        start = messages_count_text.find("(") + 1
+        end = messages_count_text.find(")")
+        if start > 0 and end > start:
+            try:
+                return int(messages_count_text[start:end])
+            except ValueError:
+                pass
+    return 0
+
+# Benötigte Spalten laut excel_struktur.txt
+REQUIRED_COLUMNS = [
+    "#", "From", "To", "Direction", "Body", "Status", "Transcript",
+    "Timestamp-Date", "Timestamp-Time", "Attachment #1", 
+    "Attachment #1 - Details", "Deleted", "Label", "Starred message"
+]
+
+class ColumnResolver:
+    """
+    Ordnet die Spaltenbezeichner aus der Kopfzeile (Zeile 2) ihren Positionen zu.
+    Alle Reader greifen darüber auf Spalten zu, statt feste Indizes zu verwenden.
+    """
+    def __init__(self, header_row):
+        self.header_to_index = {}
+        for i, header in enumerate(header_row):
+            if isinstance(header, str) and header.strip():
+                # Bei doppelten Bezeichnern gilt wie bei pandas die erste Spalte
+                self.header_to_index.setdefault(header.strip(), i)
+
+    def index(self, name):
+        """Position der Spalte oder None, wenn sie fehlt"""
+        return self.header_to_index.get(name)
+
+    def positions(self, names):
+        return [self.index(name) for name in names]
+
+    def missing(self, names):
+        return [name for name in names if name not in self.header_to_index]
+
+    def usecols(self, names):
+        """Sortierte Positionen der vorhandenen Spalten, für pd.read_excel(usecols=...)"""
+        return sorted(i for i in self.positions(names) if i is not None)
+
+    def getter(self, names):
+        """
+        Liefert eine Funktion, die aus einer Zeile (Tupel) die Werte der Spalten `names` holt.
+        Die Positionen werden einmal vorab bestimmt, fehlende Spalten liefern None.
+        """
+        positions = self.positions(names)
+
+        def get(row):
+            size = len(row)
+            return tuple(row[i] if i is not None and i < size else None for i in positions)
+        return get
+
+@timed("read_excel_file")
+def read_excel_file(excel_file, columns=REQUIRED_COLUMNS):
     """
     Liest die Excel-Datei gemäß den Angaben in excel_struktur.txt
     
     Die Funktion erkennt die Spalten anhand ihrer Bezeichner in Zeile 2,
-    nicht anhand ihrer Position.
+    nicht anhand ihrer Position. Es werden nur die Spalten `columns` geparst.
     
     Rückgabewert: DataFrame mit den relevanten Spalten und Metadaten
     """
     try:
         print(f"Lese Excel-Datei: {excel_file}")
+        count("bytes_read", os.path.getsize(excel_file))
         
         # Lese die ersten Zeilen ohne Header, um die Struktur zu verstehen
         df_raw = pd.read_excel(excel_file, header=None, nrows=5)
         
         # Extrahiere die Anzahl der Nachrichten aus der ersten Zeile, Spalte B
-        messages_count_text = df_raw.iloc[0, 1]  # Zeile 1, Spalte B (0-basiert)
-        
-        messages_count = 0
-        if isinstance(messages_count_text, str) and "(" in messages_count_text and ")" in messages_count_text:
-            # Extrahiere die Zahl zwischen Klammern
-            start = messages_count_text.find("(") + 1
-            end = messages_count_text.find(")")
-            if start > 0 and end > start:
-                try:
-                    messages_count = int(messages_count_text[start:end])
-                except ValueError:
-                    pass
+        messages_count = parse_messages_count(df_raw.iloc[0, 1])  # Zeile 1, Spalte B (0-basiert)
         
-        # Extrahiere die Spaltenbezeichner aus der zweiten Zeile
-        header_row = df_raw.iloc[1].tolist()
-        
-        # Erstelle ein Dictionary, das die Spaltenbezeichner den Spaltenindizes zuordnet
-        header_to_index = {}
-        for i, header in enumerate(header_row):
-            if pd.notna(header) and isinstance(header, str) and header.strip():
-                header_to_index[header.strip()] = i
-        
-        # Definiere die benötigten Spalten laut excel_struktur.txt
-        required_columns = [
-            "#", "From", "To", "Direction", "Body", "Status", "Transcript",
-            "Timestamp-Date", "Timestamp-Time", "Attachment #1", 
-            "Attachment #1 - Details", "Deleted", "Label", "Starred message"
-        ]
+        # Spaltenbezeichner aus der zweiten Zeile den Spaltenindizes zuordnen
+        resolver = ColumnResolver(df_raw.iloc[1].tolist())
         
         # Überprüfe, ob alle benötigten Spalten vorhanden sind
-        missing_columns = [col for col in required_columns if col not in header_to_index]
+        missing_columns = resolver.missing(columns)
         if missing_columns:
             print(f"Warnung: Folgende Spalten fehlen in der Excel-Datei: {missing_columns}")
         
-        # Lese die gesamte Excel-Datei mit den korrekten Spaltenbezeichnern
-        # Wir verwenden die zweite Zeile als Header
-        df = pd.read_excel(excel_file, header=1)
-        
-        # Erstelle ein neues DataFrame mit den benötigten Spalten
-        result_df = pd.DataFrame()
+        # Lese nur die benötigten Spalten, die zweite Zeile dient als Header
+        df = pd.read_excel(excel_file, header=1, usecols=resolver.usecols(columns))
         
-        # Füge die benötigten Spalten hinzu, wenn sie vorhanden sind
-        for col_name in required_columns:
+        # Erstelle ein neues DataFrame mit den benötigten Spalten in fester Reihenfolge
+        result_df = pd.DataFrame(index=df.index)
+        for col_name in columns:
             if col_name in df.columns:
                 result_df[col_name] = df[col_name]
             else:
@@ -82,6 +119,87 @@ def read_excel_file(excel_file):
         print(f"Fehler beim Lesen der Excel-Datei: {str(e)}")
         return None, {"error": str(e)}
 
+# Formate, die für Zeitstempel in PA-Exporten in Frage kommen (das erste ist das übliche)
+TIMESTAMP_FORMATS = [
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%m/%d/%Y %I:%M:%S %p",
+]
+
+class TimestampNormalizer:
+    """
+    Wandelt die Spalten 'Timestamp-Date' und 'Timestamp-Time' in datetime-Werte um.
+    
+    Das Format wird einmal anhand einer Stichprobe erkannt und danach für die gesamte
+    Spalte vektorisiert angewendet. Native Excel-Datumszellen werden direkt übernommen.
+    Nicht lesbare Zeitstempel werden zu None und in `failures` gezählt.
+    """
+    SAMPLE_SIZE = 200
+
+    def __init__(self):
+        self.format = None
+        self.failures = 0
+        self.missing = 0
+
+    def detect_format(self, samples):
+        """Wählt das Format, mit dem die meisten Werte der Stichprobe lesbar sind"""
+        samples = samples.head(self.SAMPLE_SIZE)
+        best_format, best_count = None, 0
+        for fmt in TIMESTAMP_FORMATS:
+            parsed = pd.to_datetime(samples, format=fmt, errors='coerce').notna().sum()
+            if parsed > best_count:
+                best_format, best_count = fmt, parsed
+        return best_format
+
+    def parse(self, dates, times):
+        """Liefert eine Liste mit datetime oder None für jede Zeile"""
+        dates = pd.Series(list(dates), dtype=object)
+        times = pd.Series(list(times), dtype=object)
+        result = pd.Series(pd.NaT, index=times.index, dtype='datetime64[us]')
+        
+        # Native Datumszellen (datetime/pd.Timestamp) müssen nicht geparst werden
+        is_native = times.map(lambda value: isinstance(value, datetime))
+        if is_native.any():
+            result[is_native] = pd.to_datetime(times[is_native])
+        
+        # Zeit als Text (ggf. mit "(UTC+0)"), Datum wird ergänzt, wenn es in der Zeit fehlt
+        is_text = ~is_native & times.notna() & (times.astype(str).str.strip() != '')
+        if is_text.any():
+            text = times[is_text].astype(str).str.replace('(UTC+0)', '', regex=False).str.strip()
+            without_date = ~text.str.contains(r'\d[./-]\d', regex=True)
+            if without_date.any():
+                date_text = dates[text.index[without_date]].map(self._date_text)
+                text[without_date] = (date_text + ' ' + text[without_date]).str.strip()
+            
+            if self.format is None:
+                self.format = self.detect_format(text)
+            parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[us]')
+            if self.format is not None:
+                parsed = pd.to_datetime(text, format=self.format, errors='coerce')
+            # Abweichende Zeilen mit den übrigen Formaten versuchen
+            for fmt in TIMESTAMP_FORMATS:
+                remaining = parsed.isna()
+                if not remaining.any():
+                    break
+                if fmt != self.format:
+                    parsed[remaining] = pd.to_datetime(text[remaining], format=fmt, errors='coerce')
+            result[is_text] = parsed
+            self.failures += int(parsed.isna().sum())
+        
+        self.missing += int((~is_native & ~is_text).sum())
+        return result.to_numpy(dtype='datetime64[us]').astype(object).tolist()
+
+    @staticmethod
+    def _date_text(value):
+        if isinstance(value, datetime):
+            return value.strftime("%d.%m.%Y")
+        if value is None or pd.isna(value):
+            return ""
+        return str(value).strip()
+
 import os
 import re
 import urllib.parse
@@ -139,6 +257,7 @@ def is_url(text):
         
     return False
 
+@timed("check_attachment_exists")
 def check_attachment_exists(excel_path, attachment_name):
     """
     Überprüft, ob ein Anhang existiert
@@ -150,18 +269,8 @@ def check_attachment_exists(excel_path, attachment_name):
     if is_url(attachment_name):
         return "URL"  # Spezialwert für URLs
         
-    # Verzeichnis mit der Excel-Datei
-    excel_dir = Path(excel_path).parent
-    
-    # Verzeichnisse für Dateianhänge
-    search_dirs = [
-        excel_dir / 'files',                     # Standard-Verzeichnis
-        excel_dir / 'instant_messages',          # Unterverzeichnis 'instant_messages'
-        excel_dir                                # Hauptverzeichnis
-    ]
-    
     # Suche in allen möglichen Verzeichnissen
-    for search_dir in search_dirs:
+    for search_dir in attachment_search_dirs(excel_path):
         if not search_dir.exists():
             continue
             
@@ -172,6 +281,96 @@ def check_attachment_exists(excel_path, attachment_name):
     
     return False
 
+# Höchstzahl gleichzeitig laufender Verzeichnis-Scans, damit Netzlaufwerke nicht überlastet werden
+DEFAULT_MAX_IN_FLIGHT = 32
+
+def attachment_search_dirs(excel_path):
+    """Verzeichnisse, in denen Anhänge gesucht werden, in absteigender Priorität"""
+    excel_dir = Path(excel_path).parent
+    return [
+        excel_dir / 'files',                     # Standard-Verzeichnis
+        excel_dir / 'instant_messages',          # Unterverzeichnis 'instant_messages'
+        excel_dir                                # Hauptverzeichnis
+    ]
+
+def _scan_directory(directory):
+    """Dateien und Unterverzeichnisse eines Verzeichnisses mit einem einzigen os.scandir (wie os.walk)"""
+    files, subdirs = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.name)
+                elif not entry.is_symlink():
+                    subdirs.append(entry.name)
+    except OSError:
+        pass
+    return files, subdirs
+
+class AttachmentIndex:
+    """
+    Dateiname -> Pfad für alle Dateien in den Anhangsverzeichnissen eines Exports.
+    
+    Statt je Anhang die Verzeichnisbäume mit os.walk zu durchsuchen, wird jedes Verzeichnis
+    einmal mit os.scandir gelesen; die Scans laufen in einem Thread-Pool mit höchstens
+    `max_in_flight` gleichzeitigen Aufträgen. Das spart auf Netzlaufwerken (NFS/SMB) fast
+    alle Round-Trips. Kommt ein Dateiname mehrfach vor, gilt wie bei check_attachment_exists
+    der erste Treffer in os.walk-Reihenfolge.
+    """
+    def __init__(self, excel_path, workers=8, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.paths = {}
+        ranks = {}
+        roots = attachment_search_dirs(excel_path)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for priority, root in enumerate(roots):
+                # Unterbäume höher priorisierter Verzeichnisse liefern hier keine neuen Treffer
+                skip = {str(earlier) for earlier in roots[:priority]}
+                for key, directory, files in self._scan_tree(pool, str(root), skip, max(1, max_in_flight)):
+                    rank = (priority, key)
+                    for name in files:
+                        if name not in ranks or rank < ranks[name]:
+                            ranks[name] = rank
+                            self.paths[name] = os.path.join(directory, name)
+
+    @staticmethod
+    def _scan_tree(pool, root, skip, max_in_flight):
+        """
+        Liefert (schlüssel, verzeichnis, dateien) für alle Verzeichnisse unter `root`.
+        Der Schlüssel (Positionen der Unterverzeichnisse ab `root`) ergibt sortiert die os.walk-Reihenfolge.
+        """
+        from collections import deque
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        queue = deque([((), root)])
+        pending = {}
+        while queue or pending:
+            while queue and len(pending) < max_in_flight:
+                key, directory = queue.popleft()
+                pending[pool.submit(_scan_directory, directory)] = (key, directory)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, directory = pending.pop(future)
+                files, subdirs = future.result()
+                yield key, directory, files
+                for i, name in enumerate(subdirs):
+                    path = os.path.join(directory, name)
+                    if path not in skip:
+                        queue.append((key + (i,), path))
+
+    def find(self, attachment_name):
+        """Wie check_attachment_exists: Pfad, "URL" oder False"""
+        if not attachment_name or pd.isna(attachment_name) or attachment_name == "":
+            return False
+        if is_url(attachment_name):
+            return "URL"
+        return self.paths.get(attachment_name, False)
+
 def categorize_attachment(attachment_name):
     """
     Kategorisiert einen Anhang basierend auf der Dateiendung oder URL
@@ -272,189 +471,259 @@ def categorize_attachment(attachment_name):
     else:
         return f"Sonstige ({ext})"
 
-def generate_statistics(df, metadata, excel_path=None, verbose=False):
+def resolve_attachments(chat, force=False, scan_workers=None, index=None):
     """
-    Generiert Statistiken aus dem DataFrame und den Metadaten
+    Sucht die Dateien aller Anhänge eines ChatExport und trägt Pfad und Typ ein.
+    Gleichnamige Anhänge werden nur einmal gesucht. Bereits aufgelöste Exporte
+    (z.B. aus der SQLite-Datenbank) werden nur mit force=True erneut durchsucht.
+    Mit `scan_workers` werden die Verzeichnisse einmal nebenläufig indiziert (AttachmentIndex),
+    statt je Anhang durchsucht zu werden, empfohlen für Netzlaufwerke. Ein bereits
+    erstellter AttachmentIndex (z.B. aus dem Cache des Report-Servers) wird über `index` übergeben.
+    """
+    from models import AttachmentType
+    
+    if chat.metadata.get("attachments_resolved") and not force:
+        return chat
+
+    if index is not None:
+        find_attachment = index.find
+    elif scan_workers:
+        with timer("attachment_index"):
+            find_attachment = AttachmentIndex(chat.excel_path, scan_workers).find
+    else:
+        find_attachment = lambda name: check_attachment_exists(chat.excel_path, name)
+
+    resolved = {}
+    for msg in chat.messages:
+        attachment = msg.attachment
+        if attachment is None:
+            continue
+        if attachment.filename not in resolved:
+            resolved[attachment.filename] = find_attachment(attachment.filename)
+        path = resolved[attachment.filename]
+        if path == "URL":
+            attachment.type = AttachmentType.URL
+            attachment.full_path = None
+        elif path:
+            attachment.full_path = Path(path)
+        else:
+            attachment.full_path = None
+    chat.metadata["attachments_resolved"] = True
+    # Die Anhänge wurden verändert, die Kennzahlen des ChatExport sind damit veraltet
+    chat.invalidate_aggregates()
+    return chat
+
+def parse_filter_date(value):
+    """Datum für --since/--until: JJJJ-MM-TT oder TT.MM.JJJJ, optional mit Uhrzeit (JJJJ-MM-TT HH:MM)"""
+    for parse in (datetime.fromisoformat, lambda text: datetime.strptime(text, '%d.%m.%Y')):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Ungültiges Datum: {value}")
+
+def add_filter_arguments(parser):
+    """Fügt die Filter-Optionen (Zeitraum, Teilnehmer, Richtung, markiert, gelöscht) zu einem ArgumentParser hinzu"""
+    group = parser.add_argument_group('Filter', 'Nur ausgewählte Nachrichten einlesen und verarbeiten')
+    group.add_argument('--since', type=parse_filter_date, metavar='DATUM',
+                       help='Nur Nachrichten ab diesem Zeitpunkt (JJJJ-MM-TT oder TT.MM.JJJJ)')
+    group.add_argument('--until', type=parse_filter_date, metavar='DATUM',
+                       help='Nur Nachrichten bis einschließlich diesem Tag (bzw. vor dieser Uhrzeit)')
+    group.add_argument('--participant', metavar='NAME',
+                       help='Nur Nachrichten dieses Teilnehmers (Chat-ID oder Teil des Namens)')
+    group.add_argument('--direction', choices=['incoming', 'outgoing'],
+                       help='Nur eingehende bzw. ausgehende Nachrichten')
+    group.add_argument('--starred-only', action='store_true', help='Nur markierte Nachrichten')
+    group.add_argument('--exclude-deleted', action='store_true', help='Gelöschte Nachrichten auslassen')
+
+def message_filter_from_args(args):
+    """MessageFilter aus den Optionen von add_filter_arguments, None ohne Filter"""
+    from datetime import timedelta
+    from models import Direction, MessageFilter
+
+    until = args.until
+    if until is not None and until == datetime.combine(until.date(), datetime.min.time()):
+        # Ein reines Datum schließt den ganzen Tag ein
+        until += timedelta(days=1)
+    message_filter = MessageFilter(
+        since=args.since,
+        until=until,
+        participant=args.participant,
+        direction=Direction.parse(args.direction) if args.direction else None,
+        starred_only=args.starred_only,
+        exclude_deleted=args.exclude_deleted
+    )
+    return message_filter or None
+
+@timed("generate_statistics")
+def generate_statistics(chat, verbose=False):
+    """
+    Generiert Statistiken aus einem ChatExport
     
     Parameter:
-    - df: DataFrame mit den Daten
-    - metadata: Dictionary mit Metadaten
-    - excel_path: Pfad zur Excel-Datei (für Anhangsuche)
+    - chat: ChatExport, dessen Anhänge bereits mit resolve_attachments aufgelöst wurden
     - verbose: Wenn True, werden detaillierte Informationen zu jedem Anhang angezeigt
     """
+    from models import AttachmentType
+
+    metadata = chat.metadata
     stats = []
     stats.append("=== Excel-Datei Statistik ===")
     stats.append(f"Dateiname: {metadata.get('file_name', 'Unbekannt')}")
     stats.append(f"Importiert am: {metadata.get('import_date', 'Unbekannt')}")
     stats.append(f"Anzahl Nachrichten (aus Header): {metadata.get('messages_count', 0)}")
     stats.append(f"Tatsächliche Anzahl Zeilen: {metadata.get('actual_rows', 0)}")
+    if metadata.get('filter'):
+        stats.append(f"Ausgewählte Nachrichten: {chat.message_count} (Filter: {metadata['filter']})")
+    if metadata.get('timestamp_failures'):
+        stats.append(f"Nicht lesbare Zeitstempel: {metadata['timestamp_failures']}")
+    first, last = chat.date_range
+    if first and last:
+        stats.append(f"Zeitraum: {first.strftime('%d.%m.%Y %H:%M:%S')} - {last.strftime('%d.%m.%Y %H:%M:%S')}")
     
-    # Prüfe, ob die Spalten vorhanden sind, bevor wir sie analysieren
-    if df is not None:
-        # Anzahl der Nachrichten mit Anhängen
-        if "Attachment #1" in df.columns:
-            # Erstelle eine Liste mit Informationen zu jedem Anhang
-            attachment_info_list = []
-            primary_attachments = 0  # Anhänge ohne Nachrichtentext
-            supplementary_attachments = 0  # Anhänge mit Nachrichtentext
-            
-            for index, row in df.iterrows():
-                attachment = row.get("Attachment #1")
-                if pd.notna(attachment) and attachment:
-                    line_number = row.get("#", index + 1)  # Verwende Spalte "#" oder Index+1 als Fallback
-                    sender = row.get("From", "Unbekannt")
-                    timestamp = row.get("Timestamp-Time", "")
-                    direction = row.get("Direction", "")
-                    body = row.get("Body", "")
-                    
-                    # Prüfe, ob ein Nachrichtentext vorhanden ist
-                    has_message_text = pd.notna(body) and body and body.strip() != ""
-                    attachment_type = "Ergänzung" if has_message_text else "Primär"
-                    
-                    # Zähle die Anhänge nach Typ
-                    if has_message_text:
-                        supplementary_attachments += 1
-                    else:
-                        primary_attachments += 1
-                    
-                    # Überprüfe, ob der Anhang existiert
-                    attachment_path = None
-                    if excel_path:
-                        attachment_path = check_attachment_exists(excel_path, attachment)
-                    
-                    attachment_info = {
-                        "line_number": line_number,
-                        "attachment": attachment,
-                        "sender": sender,
-                        "timestamp": timestamp,
-                        "direction": direction,
-                        "body": body if has_message_text else "",
-                        "has_message_text": has_message_text,
-                        "attachment_type": attachment_type,
-                        "category": categorize_attachment(attachment),
-                        "exists": bool(attachment_path),
-                        "path": attachment_path
-                    }
-                    attachment_info_list.append(attachment_info)
-            
-            attachments_count = len(attachment_info_list)
-            stats.append(f"Nachrichten mit Anhängen: {attachments_count}")
-            stats.append(f"  Primäre Anhänge (ohne Text): {primary_attachments}")
-            stats.append(f"  Ergänzende Anhänge (mit Text): {supplementary_attachments}")
-            
-            # Zähle vorhandene und fehlende Anhänge
-            if excel_path:
-                url_count = 0
-                existing_attachments = 0
-                missing_attachments = 0
-                
-                for info in attachment_info_list:
-                    if info["path"] == "URL":
-                        url_count += 1
-                    elif info["exists"]:
-                        existing_attachments += 1
-                    else:
-                        missing_attachments += 1
-                
-                stats.append(f"Vorhandene Anhänge: {existing_attachments}")
-                stats.append(f"URLs/Links: {url_count}")
-                stats.append(f"Fehlende Anhänge: {missing_attachments}")
-                
-                # Kategorisiere die Anhänge
-                categories = {}
-                attachment_extensions = {}
-                directories = {}
-                
-                for info in attachment_info_list:
-                    # Zähle Kategorien
-                    category = info["category"]
-                    categories[category] = categories.get(category, 0) + 1
-                    
-                    # Unterscheide zwischen URLs und Dateien
-                    if info["path"] == "URL" or category.startswith("URL"):
-                        # Für URLs keine Dateiendung zählen
-                        pass
-                    else:
-                        # Zähle Dateiendungen nur für echte Dateien
-                        _, ext = os.path.splitext(info["attachment"].lower())
-                        if ext:
-                            attachment_extensions[ext] = attachment_extensions.get(ext, 0) + 1
-                    
-                    # Zähle Verzeichnisse nur für echte Dateien, nicht für URLs
-                    if info["path"] and info["path"] != "URL":
-                        directory = os.path.dirname(info["path"])
-                        directories[directory] = directories.get(directory, 0) + 1
-                
-                # Ausgabe der Kategorien
-                stats.append("\nAnhangskategorien:")
-                for category, count in sorted(categories.items(), key=lambda x: x[1], reverse=True):
-                    stats.append(f"  {category}: {count}")
-                
-                # Ausgabe der häufigsten Dateiendungen
-                if attachment_extensions:
-                    stats.append("\nDateiendungen:")
-                    for ext, count in sorted(attachment_extensions.items(), key=lambda x: x[1], reverse=True)[:10]:  # Top 10
-                        stats.append(f"  {ext}: {count}")
-                
-                # Analyse der Verzeichnisse, in denen Anhänge gefunden wurden
-                if directories:
-                    stats.append("\nVerzeichnisse mit Anhängen:")
-                    for directory, count in sorted(directories.items(), key=lambda x: x[1], reverse=True)[:5]:  # Top 5
-                        stats.append(f"  {directory}: {count} Dateien")
-                
-                # Im Verbose-Modus alle Anhänge auflisten
-                if verbose and attachment_info_list:
-                    stats.append("\n=== Detaillierte Anhangsübersicht ===")
-                    stats.append("Zeile | Sender | Zeitstempel | Richtung | Typ | Anhang | Kategorie | Status")
-                    stats.append("-" * 120)
-                    
-                    # Sortiere nach Zeilennummer
-                    for info in sorted(attachment_info_list, key=lambda x: x["line_number"]):
-                        line = info["line_number"]
-                        sender = info["sender"][:20] if len(str(info["sender"])) > 20 else info["sender"]
-                        timestamp = info["timestamp"][:19] if len(str(info["timestamp"])) > 19 else info["timestamp"]
-                        direction = info["direction"]
-                        attachment_type = info["attachment_type"]
-                        attachment = info["attachment"][:30] if len(info["attachment"]) > 30 else info["attachment"]
-                        category = info["category"]
-                        status = "Vorhanden" if info["exists"] else "Fehlt"
-                        
-                        stats.append(f"{line:5} | {sender:20} | {timestamp:19} | {direction:8} | {attachment_type:8} | {attachment:30} | {category:20} | {status}")
-                        
-                        # Bei Nachrichten mit Text den Textanfang anzeigen
-                        if info["has_message_text"]:
-                            body_text = info["body"][:80] + "..." if len(info["body"]) > 80 else info["body"]
-                            stats.append(f"       Text: {body_text}")
-                        
-                        # Bei vorhandenen Anhängen den Pfad anzeigen
-                        if info["exists"]:
-                            stats.append(f"       Pfad: {info['path']}")
-                        
-                        stats.append("-" * 120)
+    # Erstelle eine Liste mit Informationen zu jedem Anhang
+    attachment_info_list = []
+    primary_attachments = 0  # Anhänge ohne Nachrichtentext
+    supplementary_attachments = 0  # Anhänge mit Nachrichtentext
+    
+    for index, msg in chat.iter_attachment_messages():
+        attachment = msg.attachment.filename
+        
+        # Prüfe, ob ein Nachrichtentext vorhanden ist
+        has_message_text = bool(msg.body)
+        attachment_type = "Ergänzung" if has_message_text else "Primär"
         
-        # Anzahl der gelöschten Nachrichten
-        if "Deleted" in df.columns:
-            deleted_count = df[df["Deleted"] == "Yes"].shape[0]
-            stats.append(f"Gelöschte Nachrichten: {deleted_count}")
+        # Zähle die Anhänge nach Typ
+        if has_message_text:
+            supplementary_attachments += 1
+        else:
+            primary_attachments += 1
+        
+        if msg.attachment.type == AttachmentType.URL:
+            attachment_path = "URL"
+        elif msg.attachment.full_path:
+            attachment_path = str(msg.attachment.full_path)
+        else:
+            attachment_path = None
+        
+        attachment_info = {
+            "line_number": msg.number if msg.number is not None else index + 1,
+            "attachment": attachment,
+            "sender": msg.sender.name,
+            "timestamp": msg.timestamp.strftime('%d.%m.%Y %H:%M:%S') if msg.timestamp else "",
+            "direction": msg.direction.label,
+            "body": msg.body,
+            "has_message_text": has_message_text,
+            "attachment_type": attachment_type,
+            "category": categorize_attachment(attachment),
+            "exists": bool(attachment_path),
+            "path": attachment_path
+        }
+        attachment_info_list.append(attachment_info)
+    
+    attachments_count = len(attachment_info_list)
+    stats.append(f"Nachrichten mit Anhängen: {attachments_count}")
+    stats.append(f"  Primäre Anhänge (ohne Text): {primary_attachments}")
+    stats.append(f"  Ergänzende Anhänge (mit Text): {supplementary_attachments}")
+    
+    # Vorhandene und fehlende Anhänge werden vom ChatExport laufend gezählt
+    attachment_stats = chat.attachment_stats
+    stats.append(f"Vorhandene Anhänge: {attachment_stats['found']}")
+    stats.append(f"URLs/Links: {attachment_stats['urls']}")
+    stats.append(f"Fehlende Anhänge: {attachment_stats['not_found']}")
+    
+    # Kategorisiere die Anhänge
+    categories = {}
+    attachment_extensions = {}
+    directories = {}
+    
+    for info in attachment_info_list:
+        # Zähle Kategorien
+        category = info["category"]
+        categories[category] = categories.get(category, 0) + 1
         
-        # Anzahl der markierten Nachrichten
-        if "Starred message" in df.columns:
-            starred_count = df["Starred message"].notna().sum()
-            stats.append(f"Markierte Nachrichten: {starred_count}")
+        # Unterscheide zwischen URLs und Dateien
+        if info["path"] == "URL" or category.startswith("URL"):
+            # Für URLs keine Dateiendung zählen
+            pass
+        else:
+            # Zähle Dateiendungen nur für echte Dateien
+            _, ext = os.path.splitext(info["attachment"].lower())
+            if ext:
+                attachment_extensions[ext] = attachment_extensions.get(ext, 0) + 1
         
-        # Verteilung der Nachrichtenrichtung
-        if "Direction" in df.columns:
-            direction_counts = df["Direction"].value_counts()
-            stats.append("\nNachrichtenrichtung:")
-            for direction, count in direction_counts.items():
-                stats.append(f"  {direction}: {count}")
+        # Zähle Verzeichnisse nur für echte Dateien, nicht für URLs
+        if info["path"] and info["path"] != "URL":
+            directory = os.path.dirname(info["path"])
+            directories[directory] = directories.get(directory, 0) + 1
+    
+    # Ausgabe der Kategorien
+    stats.append("\nAnhangskategorien:")
+    for category, number in sorted(categories.items(), key=lambda x: x[1], reverse=True):
+        stats.append(f"  {category}: {number}")
+    
+    # Ausgabe der häufigsten Dateiendungen
+    if attachment_extensions:
+        stats.append("\nDateiendungen:")
+        for ext, number in sorted(attachment_extensions.items(), key=lambda x: x[1], reverse=True)[:10]:  # Top 10
+            stats.append(f"  {ext}: {number}")
+    
+    # Analyse der Verzeichnisse, in denen Anhänge gefunden wurden
+    if directories:
+        stats.append("\nVerzeichnisse mit Anhängen:")
+        for directory, number in sorted(directories.items(), key=lambda x: x[1], reverse=True)[:5]:  # Top 5
+            stats.append(f"  {directory}: {number} Dateien")
+    
+    # Im Verbose-Modus alle Anhänge auflisten
+    if verbose and attachment_info_list:
+        stats.append("\n=== Detaillierte Anhangsübersicht ===")
+        stats.append("Zeile | Sender | Zeitstempel | Richtung | Typ | Anhang | Kategorie | Status")
+        stats.append("-" * 120)
         
-        # Verteilung des Nachrichtenstatus
-        if "Status" in df.columns:
-            status_counts = df["Status"].value_counts()
-            stats.append("\nNachrichtenstatus:")
-            for status, count in status_counts.items():
-                stats.append(f"  {status}: {count}")
+        # Sortiere nach Zeilennummer
+        for info in sorted(attachment_info_list, key=lambda x: x["line_number"]):
+            line = info["line_number"]
+            sender = info["sender"][:20]
+            timestamp = info["timestamp"][:19]
+            direction = info["direction"]
+            attachment_type = info["attachment_type"]
+            attachment = info["attachment"][:30]
+            category = info["category"]
+            status = "Vorhanden" if info["exists"] else "Fehlt"
+            
+            stats.append(f"{line:5} | {sender:20} | {timestamp:19} | {direction:8} | {attachment_type:8} | {attachment:30} | {category:20} | {status}")
+            
+            # Bei Nachrichten mit Text den Textanfang anzeigen
+            if info["has_message_text"]:
+                body_text = info["body"][:80] + "..." if len(info["body"]) > 80 else info["body"]
+                stats.append(f"       Text: {body_text}")
+            
+            # Bei vorhandenen Anhängen den Pfad anzeigen
+            if info["exists"]:
+                stats.append(f"       Pfad: {info['path']}")
+            
+            stats.append("-" * 120)
+    
+    # Anzahl der gelöschten und markierten Nachrichten
+    stats.append(f"Gelöschte Nachrichten: {chat.deleted_count}")
+    stats.append(f"Markierte Nachrichten: {chat.starred_count}")
+    
+    # Verteilung der Nachrichtenrichtung
+    direction_counts = {direction.label: number for direction, number in chat.direction_counts.items() if direction.label}
+    stats.append("\nNachrichtenrichtung:")
+    for direction, number in sorted(direction_counts.items(), key=lambda x: x[1], reverse=True):
+        stats.append(f"  {direction}: {number}")
+    
+    # Verteilung des Nachrichtenstatus
+    status_counts = {status: number for status, number in chat.status_counts.items() if status}
+    stats.append("\nNachrichtenstatus:")
+    for status, number in sorted(status_counts.items(), key=lambda x: x[1], reverse=True):
+        stats.append(f"  {status}: {number}")
+    
+    # Nachrichten je Teilnehmer
+    stats.append("\nNachrichten je Teilnehmer:")
+    for participant, number in sorted(chat.participant_counts.items(), key=lambda x: x[1], reverse=True):
+        stats.append(f"  {participant.name or 'Unbekannt'}: {number}")
     
     return "\n".join(stats)
 
@@ -3,7 +3,8 @@
 
 import argparse
 import sys
-from functions import read_excel_file, generate_statistics
+from functions import add_filter_arguments, generate_statistics, message_filter_from_args, resolve_attachments
+from models import get_reader
 
 
 def main():
@@ -15,6 +16,10 @@ def main():
     parser = argparse.ArgumentParser(description='Excel Chat Export Statistik Generator')
     parser.add_argument('excel_file', help='Pfad zur Excel-Datei')
     parser.add_argument('-v', '--verbose', action='store_true', help='Ausführliche Ausgabe')
+    parser.add_argument('--scan-workers', type=int, default=None, metavar='N',
+                        help='Anhangsverzeichnisse einmal mit N Threads indizieren (empfohlen für Netzlaufwerke)')
+    parser.add_argument('--columnar', action='store_true', help='Nachrichten spaltenweise (NumPy) im Speicher halten')
+    add_filter_arguments(parser)
     args = parser.parse_args()
     
     # Überprüfe, ob die Excel-Datei angegeben wurde
@@ -23,15 +28,18 @@ def main():
         parser.print_help()
         sys.exit(1)
     
-    # Lese die Excel-Datei mit der Funktion aus excel_reader
-    df, metadata = read_excel_file(args.excel_file)
-    
-    if df is None:
+    # Lese die Excel-Datei in einen ChatExport ein
+    try:
+        chat = get_reader(args.excel_file).read(args.excel_file, message_filter_from_args(args))
+    except ValueError:
         print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
         sys.exit(1)
+    resolve_attachments(chat, scan_workers=args.scan_workers)
+    if args.columnar:
+        chat.to_columnar()
     
     # Zeige Statistiken an
-    stats = generate_statistics(df, metadata, args.excel_file, args.verbose)
+    stats = generate_statistics(chat, args.verbose)
     print(stats)
 
 if __name__ == "__main__":
@@ -1,133 +1,106 @@
-import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 from pathlib import Path
 import re
-from PIL import Image
 import os
 import argparse
 import sys
+import functools
+import io
+import json
 import math
 import traceback
+import tempfile
+from typing import NamedTuple
+# Schwere Abhängigkeiten (pandas, reportlab, PIL) werden erst bei Bedarf geladen,
+# damit der reine Statistik-Pfad schnell startet.
 # Audio/Video imports deaktiviert, um PyAudio-Abhängigkeit zu vermeiden
 # import whisper
 # import torch
 # from pydub import AudioSegment
 # from moviepy.editor import VideoFileClip
-import tempfile
 
-# Import der neuen Excel-Reader-Funktionalität
-from excel_reader import read_excel_file, generate_statistics, is_url
+import transcription as transcription_cache
+from instrumentation import StageProfiler, count, metrics, timed, timer
+from media_hash import canonical_paths
+from report_backends import BACKENDS, HtmlReportBackend, ReportBackend
+from models import (get_reader, Direction, AttachmentType, MessageStatus, UNKNOWN_PARTICIPANT,
+                    IMAGE_EXTENSIONS, AUDIO_EXTENSIONS, VIDEO_EXTENSIONS)
 
-# Global counters
-attachment_not_found_counter = 0
-attachment_found_counter = 0
+# Fonts werden nur einmal pro Prozess registriert
+_fonts_registered = False
 
-def parse_participant(from_field):
+def register_fonts():
     """
-    Extrahiert Chat-ID und Namen aus dem From-Feld.
-    Format ist typischerweise: "Name (ID)" oder nur "Name".
+    Registriert die TTF-Schriften für den PDF-Export.
+    Wird erst beim Rendern aufgerufen, damit der Statistik-Pfad reportlab nicht laden muss.
     """
-    if not from_field or from_field == 'nan':
-        return None, None
-        
-    # Suche nach dem Muster "Name (ID)"
-    match = re.search(r'(.+?)\s*\(([^)]+)\)', from_field)
-    if match:
-        name = match.group(1).strip()
-        chat_id = match.group(2).strip()
-        return chat_id, name
-    else:
-        # Wenn kein Muster gefunden wurde, verwende das gesamte Feld als Namen
-        return from_field, from_field
+    global _fonts_registered
+    if _fonts_registered:
+        return
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
 
-# Sichere Funktion zum Abrufen von Zellwerten aus einer DataFrame-Zeile
-def safe_get_cell(row, idx, default='', verbose=False):
+    font_path = Path(__file__).parent / 'fonts'
     try:
-        if idx < len(row):
-            value = str(row.iloc[idx]).strip()
-            return value if value != 'nan' else default
-        return default
+        # Register DejaVuSans font for normal text
+        pdfmetrics.registerFont(TTFont('DejaVuSans', str(font_path / 'DejaVuSans.ttf')))
+        # Register Symbola font for emojis
+        pdfmetrics.registerFont(TTFont('Symbola', str(font_path / 'Symbola.ttf')))
+        print("Fonts registered successfully")
     except Exception as e:
-        if verbose:
-            print(f"Fehler beim Lesen der Zelle {idx}: {e}")
-        return default
+        print(f"Error loading fonts: {e}")
+        print("Some characters might not display correctly.")
+    _fonts_registered = True
 
-def find_attachment_file(excel_path, attachment_name):
-    """
-    Search for an attachment file in multiple directories parallel to the Excel file.
-    Returns the full path if found, "URL" if it's a URL, None otherwise.
-    """
-    global attachment_not_found_counter
-    global attachment_found_counter
-    
-    #print(f"Searching for attachment: {attachment_name}")
-    if not attachment_name or attachment_name == 'nan':
-        return None
-    
-    # Prüfe, ob es sich um eine URL handelt
-    if is_url(attachment_name):
-        return "URL"
-        
-    # Get the directory containing the Excel file
-    excel_dir = Path(excel_path).parent
-    
-    # Verzeichnisse für Dateianhänge
-    search_dirs = [
-        excel_dir / 'files',                     # Standard-Verzeichnis
-        excel_dir / 'instant_messages',          # Unterverzeichnis 'instant_messages'
-        excel_dir                                # Hauptverzeichnis
-    ]
-    
-    # Suche in allen möglichen Verzeichnissen
-    for search_dir in search_dirs:
-        if not search_dir.exists():
-            continue
-            
-        # Suche nach der Datei in allen Unterverzeichnissen
-        for root, _, files in os.walk(search_dir):
-            if attachment_name in files:
-                attachment_found_counter += 1
-                return os.path.join(root, attachment_name)
-    
-    attachment_not_found_counter += 1
-    #print(f"Warning: Attachment not found: {attachment_name}")
-    return None
+# Umbruchbreite und Zeilenabstand der Nachrichtentexte in der mittleren Spalte
+TEXT_WIDTH = 200
+LINE_SPACING = 12
+# Anzahl umbrochener Texte im Layout-Cache von ChatReport
+DEFAULT_LAYOUT_CACHE_SIZE = 4096
+
+class TextLayout(NamedTuple):
+    """Umbrochene Zeilen eines Textes und die Höhe des Blocks"""
+    lines: tuple
+    height: int
 
 class ChatReport:
-    def __init__(self, verbose=False, model_name="medium"):
+    def __init__(self, verbose=False, model_name="medium", image_dpi=None, media_digests=None,
+                 layout_cache_size=DEFAULT_LAYOUT_CACHE_SIZE, transcriber=None):
+        from reportlab.lib.pagesizes import A4
         self.page_width, self.page_height = A4
         self.margin = 50
         self.line_height = 14
         self.y_position = self.page_height - self.margin
         self.max_image_height = 200
         self.message_count = 0
+        self.images_embedded = 0
         self.current_page = 1  # Aktuelle Seite
         self.total_pages = 1   # Mindestens eine Seite
+        self.message_start_page = 1  # Seite, auf der die zuletzt gezeichnete Nachricht beginnt
         self.verbose = verbose
         self.model_name = model_name  # Whisper model name
+        self.image_dpi = image_dpi  # Bilder vor dem Einbetten auf diese Auflösung verkleinern (None = Original)
+        # Inhalts-Digests der Anhänge (media_hash): gleiche Bilder werden nur einmal eingebettet,
+        # gleiche Audiodateien nur einmal transkribiert
+        self.media_digests = media_digests or {}
+        self.canonical_media = canonical_paths(self.media_digests)
+        self.transcriptions_by_digest = {}
+        # Ergebnis der Spracherkennung je Datei, auch None: add_chat_line fragt eine Nachricht
+        # mehrfach ab, fehlgeschlagene Dateien sollen trotzdem nur einmal dekodiert werden
+        self.transcriptions_by_path = {}
+        self.prefetcher = None  # siehe start_prefetch
+        self.prepared_images = {}  # siehe prepare_image
+        # Umbruch je (Text, Schrift, Größe, Breite) als LRU-Cache, 0 schaltet ihn ab
+        self.layout_cache = functools.lru_cache(maxsize=layout_cache_size or 0)(self.layout_text)
 
-        # Whisper model loading deaktiviert
-        print(f"Audio transcription disabled - Whisper model '{self.model_name}' not loaded")
-        self._whisper_model = None
-        
-        # Device information
-        print("Audio transcription disabled - no device needed")
+        # Spracherkennung nur mit einem asr.WhisperTranscriber (lädt das Modell beim ersten Audio)
+        self.transcriber = transcriber
+        if transcriber is not None:
+            print(f"Audio transcription: {transcriber.describe()}")
+        else:
+            print(f"Audio transcription disabled - Whisper model '{self.model_name}' not loaded")
+            print("Audio transcription disabled - no device needed")
         
-        # Register fonts
-        font_path = Path(__file__).parent / 'fonts'
-        try:
-            # Register DejaVuSans font for normal text
-            pdfmetrics.registerFont(TTFont('DejaVuSans', str(font_path / 'DejaVuSans.ttf')))
-            # Register Symbola font for emojis
-            pdfmetrics.registerFont(TTFont('Symbola', str(font_path / 'Symbola.ttf')))
-            print("Fonts registered successfully")
-        except Exception as e:
-            print(f"Error loading fonts: {e}")
-            print("Some characters might not display correctly.")
     
     def add_page_number(self, canvas):
         """Add page number to current page."""
@@ -187,18 +160,35 @@ class ChatReport:
                 current_x += size/2
         return current_x - x  # Return total width
         
-    def add_chat_line(self, canvas, message_data):
+    def message_body_text(self, message):
+        """Text, der für eine Nachricht angezeigt wird (Platzhalter für leere Nachrichten)"""
+        if message.body:
+            return message.body
+        if message.attachment is None:
+            return "[Empty message]"
+        if message.attachment.full_path or message.attachment.type == AttachmentType.URL:
+            return ""  # Anhang wird separat angezeigt
+        return f"[Missing Attachment: {message.attachment.filename}]"
+
+    @timed("add_chat_line")
+    def add_chat_line(self, canvas, message):
+        # Bilder werden je Nachricht einmal vorbereitet (Höhe und Zeichnen verwenden dasselbe Ergebnis)
+        self.prepared_images = {}
         if self.y_position < self.margin + self.line_height:
             self.new_page(canvas)
             
-        sender_name = str(message_data.get('sender_name', ''))
-        message_body = str(message_data.get('body', ''))
-        timestamp = str(message_data.get('timestamp', ''))
-        is_owner = message_data.get('is_owner', False)
-        is_read = str(message_data.get('Status', ''))
-        read_status = "✔️ Read" if "read" in is_read.lower() else ""
-        attachment = str(message_data.get('attachment', ''))
-        attachment_path = message_data.get('attachment_path', '')
+        sender_name = message.sender.name
+        message_body = self.message_body_text(message)
+        timestamp = message.timestamp.strftime('%d.%m.%Y %H:%M:%S') if message.timestamp else ''
+        is_owner = message.direction == Direction.OUTGOING
+        read_status = "✔️ Read" if message.status_code is MessageStatus.READ else ""
+        attachment = message.attachment.filename if message.attachment else ''
+        attachment_path = ''
+        if message.attachment:
+            if message.attachment.type == AttachmentType.URL:
+                attachment_path = "URL"
+            elif message.attachment.full_path:
+                attachment_path = str(message.attachment.full_path)
         
         # Debug output for attachments
         if attachment and attachment != 'nan':
@@ -255,21 +245,7 @@ class ChatReport:
         # Calculate total height for background
         total_height = max(24, y_offset + 12)
         if message_body and message_body != 'nan':
-            words = message_body.split()
-            current_line = ""
-            num_lines = 1
-            
-            for word in words:
-                test_line = current_line + " " + word if current_line else word
-                width = self.calculate_text_width(canvas, test_line)
-                
-                if width > 200:
-                    num_lines += 1
-                    current_line = word
-                else:
-                    current_line = test_line
-            
-            total_height = max(total_height, num_lines * 12 + 24)
+            total_height = max(total_height, max(self.wrap_text(message_body).height, 12) + 24)
             
         # Berechne zusätzliche Höhe für Anhänge
         if attachment and attachment != 'nan':
@@ -279,67 +255,30 @@ class ChatReport:
                 total_height += 20
             elif self.is_image_file(attachment_path):
                 try:
-                    img = Image.open(attachment_path)
-                    img_width, img_height = img.size
-                    
-                    # Calculate scale factors
-                    width_scale = max_content_width / img_width
-                    height_scale = self.max_image_height / img_height
-                    scale = min(width_scale, height_scale, 1.0)
-                    
-                    # Calculate final height
-                    final_height = img_height * scale
+                    _, _, final_height = self.prepare_image(attachment_path, max_content_width, self.max_image_height)
                     total_height += final_height + 10
-                except:
+                except Exception:
                     total_height += 10
             elif self.is_audio_file(attachment_path):
                 # Prüfe ob eine Transkription existiert
-                transcription, is_video = self.transcribe_audio(attachment_path)
+                transcription, is_video = self.get_transcription(message.attachment)
                 if transcription:
                     # Höhe für Header und Abstand
                     total_height += 20
                     # Berechne Höhe für Transkriptionstext
-                    words = str(transcription).split()
-                    current_line = ""
-                    num_lines = 0
-                    
-                    for word in words:
-                        test_line = current_line + " " + word if current_line else word
-                        width = self.calculate_text_width(canvas, test_line)
-                        if width > 200:
-                            num_lines += 1
-                            current_line = word
-                        else:
-                            current_line = test_line
-                    if current_line:
-                        num_lines += 1
                     # Transkriptionstext + Abstand nach unten
-                    total_height += num_lines * 12 + 15
+                    total_height += self.wrap_text(str(transcription)).height + 15
                 else:
                     total_height += 10
             elif self.is_video_file(attachment_path):
                 # Prüfe ob eine Transkription existiert
-                transcription, is_video = self.transcribe_audio(attachment_path)
+                transcription, is_video = self.get_transcription(message.attachment)
                 if transcription:
                     # Höhe für Header und Abstand
                     total_height += 20
                     # Berechne Höhe für Transkriptionstext
-                    words = str(transcription).split()
-                    current_line = ""
-                    num_lines = 0
-                    
-                    for word in words:
-                        test_line = current_line + " " + word if current_line else word
-                        width = self.calculate_text_width(canvas, test_line)
-                        if width > 200:
-                            num_lines += 1
-                            current_line = word
-                        else:
-                            current_line = test_line
-                    if current_line:
-                        num_lines += 1
                     # Transkriptionstext + Abstand nach unten
-                    total_height += num_lines * 12 + 15
+                    total_height += self.wrap_text(str(transcription)).height + 15
                 else:
                     total_height += 10
             else:
@@ -351,6 +290,8 @@ class ChatReport:
             self.y_position = self.page_height - self.margin
             # Hintergrundfarbe nach Seitenumbruch neu setzen
             canvas.setFillColorRGB(*background_color)
+        # Seite, auf der die Nachricht beginnt (für den Suchindex)
+        self.message_start_page = self.current_page
         
         # Draw background including timestamp area and transcription
         canvas.rect(self.margin - 10, self.y_position - total_height, 
@@ -364,55 +305,25 @@ class ChatReport:
             
             # Höhe für Nachrichtentext
             if message_body and message_body != 'nan':
-                words = message_body.split()
-                current_line = ""
-                num_lines = 0
-                
-                for word in words:
-                    test_line = current_line + " " + word if current_line else word
-                    width = self.calculate_text_width(canvas, test_line)
-                    if width > 200:
-                        num_lines += 1
-                        current_line = word
-                    else:
-                        current_line = test_line
-                if current_line:
-                    num_lines += 1
-                message_height = num_lines * 12 + 15  # Text + Abstand
+                message_height = self.wrap_text(message_body).height + 15  # Text + Abstand
 
             # Höhe für Anhänge
             attachment_height = 0
             if attachment and attachment != 'nan':
                 if self.is_image_file(attachment_path):
                     try:
-                        img = Image.open(attachment_path)
-                        img_width, img_height = img.size
-                        width_scale = max_content_width / img_width
-                        height_scale = self.max_image_height / img_height
-                        scale = min(width_scale, height_scale, 1.0)
-                        attachment_height = img_height * scale + 10
-                    except:
+                        _, _, final_height = self.prepare_image(attachment_path, max_content_width,
+                                                                self.max_image_height)
+                        attachment_height = final_height + 10
+                    except Exception:
                         attachment_height = 10
                 elif self.is_audio_file(attachment_path) or self.is_video_file(attachment_path):
-                    transcription, is_video = self.transcribe_audio(attachment_path)
+                    transcription, is_video = self.get_transcription(message.attachment)
                     if transcription:
                         # Höhe für Header
                         attachment_height += 20
                         # Höhe für Transkriptionstext
-                        words = str(transcription).split()
-                        current_line = ""
-                        num_lines = 0
-                        for word in words:
-                            test_line = current_line + " " + word if current_line else word
-                            width = self.calculate_text_width(canvas, test_line)
-                            if width > 200:
-                                num_lines += 1
-                                current_line = word
-                            else:
-                                current_line = test_line
-                        if current_line:
-                            num_lines += 1
-                        attachment_height += num_lines * 12 + 15
+                        attachment_height += self.wrap_text(str(transcription)).height + 15
 
             # Gesamthöhe berechnen
             total_height = max(message_height, 24) + attachment_height  # Mindestens 24 für Name und Timestamp
@@ -435,22 +346,8 @@ class ChatReport:
             
             # Middle: message with emoji support
             if message_body and message_body != 'nan':
-                words = message_body.split()
-                current_line = ""
-                
-                for word in words:
-                    test_line = current_line + " " + word if current_line else word
-                    width = self.calculate_text_width(canvas, test_line)
-                    
-                    if width > 200:
-                        self.draw_text_with_emojis(canvas, current_line, middle_col, self.y_position - y_offset)
-                        current_line = word
-                        y_offset += 12
-                    else:
-                        current_line = test_line
-                
-                if current_line:
-                    self.draw_text_with_emojis(canvas, current_line, middle_col, self.y_position - y_offset)
+                for line in self.wrap_text(message_body).lines:
+                    self.draw_text_with_emojis(canvas, line, middle_col, self.y_position - y_offset)
                     y_offset += 12
             
             # Handle attachment
@@ -474,7 +371,7 @@ class ChatReport:
                     # Transcribe audio/video and display result
                     if self.verbose:
                         print(f"Attempting to transcribe: {attachment_path}")
-                    transcription, is_video = self.transcribe_audio(attachment_path)
+                    transcription, is_video = self.get_transcription(message.attachment)
                     if transcription:
                         y_offset += 5  # Abstand vor der Transkription
                         canvas.setFont('DejaVuSans', 8)
@@ -483,19 +380,8 @@ class ChatReport:
                         y_offset += 12
                         # Display transcription text
                         canvas.setFont('DejaVuSans', 10)
-                        words = str(transcription).split()
-                        current_line = ""
-                        for word in words:
-                            test_line = current_line + " " + word if current_line else word
-                            width = self.calculate_text_width(canvas, test_line)
-                            if width > 200:
-                                self.draw_text_with_emojis(canvas, current_line, middle_col + 10, self.y_position - y_offset)
-                                current_line = word
-                                y_offset += 12
-                            else:
-                                current_line = test_line
-                        if current_line:
-                            self.draw_text_with_emojis(canvas, current_line, middle_col + 10, self.y_position - y_offset)
+                        for line in self.wrap_text(str(transcription)).lines:
+                            self.draw_text_with_emojis(canvas, line, middle_col + 10, self.y_position - y_offset)
                             y_offset += 12
                     else:
                         canvas.setFont('DejaVuSans', 8)
@@ -524,22 +410,8 @@ class ChatReport:
             
             # Middle: message with emoji support
             if message_body and message_body != 'nan':
-                words = message_body.split()
-                current_line = ""
-                
-                for word in words:
-                    test_line = current_line + " " + word if current_line else word
-                    width = self.calculate_text_width(canvas, test_line)
-                    
-                    if width > 200:
-                        self.draw_text_with_emojis(canvas, current_line, middle_col, self.y_position - y_offset)
-                        current_line = word
-                        y_offset += 12
-                    else:
-                        current_line = test_line
-                
-                if current_line:
-                    self.draw_text_with_emojis(canvas, current_line, middle_col, self.y_position - y_offset)
+                for line in self.wrap_text(message_body).lines:
+                    self.draw_text_with_emojis(canvas, line, middle_col, self.y_position - y_offset)
                     y_offset += 12
             
             # Handle attachment
@@ -563,7 +435,7 @@ class ChatReport:
                     # Transcribe audio/video and display result
                     if self.verbose:
                         print(f"Attempting to transcribe: {attachment_path}")
-                    transcription, is_video = self.transcribe_audio(attachment_path)
+                    transcription, is_video = self.get_transcription(message.attachment)
                     if transcription:
                         y_offset += 5  # Abstand vor der Transkription
                         canvas.setFont('DejaVuSans', 8)
@@ -572,19 +444,8 @@ class ChatReport:
                         y_offset += 12
                         # Display transcription text
                         canvas.setFont('DejaVuSans', 10)
-                        words = str(transcription).split()
-                        current_line = ""
-                        for word in words:
-                            test_line = current_line + " " + word if current_line else word
-                            width = self.calculate_text_width(canvas, test_line)
-                            if width > 200:
-                                self.draw_text_with_emojis(canvas, current_line, middle_col + 10, self.y_position - y_offset)
-                                current_line = word
-                                y_offset += 12
-                            else:
-                                current_line = test_line
-                        if current_line:
-                            self.draw_text_with_emojis(canvas, current_line, middle_col + 10, self.y_position - y_offset)
+                        for line in self.wrap_text(str(transcription)).lines:
+                            self.draw_text_with_emojis(canvas, line, middle_col + 10, self.y_position - y_offset)
                             y_offset += 12
                     else:
                         canvas.setFont('DejaVuSans', 8)
@@ -614,20 +475,20 @@ class ChatReport:
         """Check if the filename has an image extension."""
         if not filename:
             return False
-        return Path(filename).suffix.lower() in {'.jpg', '.jpeg', '.png', '.gif', '.bmp'}
+        return Path(filename).suffix.lower() in IMAGE_EXTENSIONS
 #pragma endregion
 
     def is_audio_file(self, filename):
         """Check if the filename has an audio extension."""
         if not filename:
             return False
-        return Path(filename).suffix.lower() in {'.mp3', '.wav', '.m4a', '.ogg', '.aac', '.m4a'}
+        return Path(filename).suffix.lower() in AUDIO_EXTENSIONS
         
     def is_video_file(self, filename):
         """Check if the filename has a video extension."""
         if not filename:
             return False
-        return Path(filename).suffix.lower() in {'.mp4', '.avi', '.mov', '.mkv'}
+        return Path(filename).suffix.lower() in VIDEO_EXTENSIONS
         
     def extract_audio_from_video(self, video_path):
         """Extract audio from video file and return path to temporary audio file.
@@ -639,73 +500,64 @@ class ChatReport:
 
     def get_transcription_path(self, audio_path):
         """Get the path for the transcription file."""
-        # Convert audio_path to absolute path
-        abs_audio_path = Path(audio_path).resolve()
-        #print(f"Audio file absolute path: {abs_audio_path}")
-        
-        # Get the directory containing the 'files' directory
-        base_dir = abs_audio_path.parent.parent.parent  # Go up from audio file to 'files' directory, then up again to root
-        #print(f"Base directory: {base_dir}")
-        
-        # Create transcriptions directory parallel to 'files'
-        trans_dir = base_dir / 'transcriptions'
-        #print(f"Creating transcriptions directory at: {trans_dir}")
-        trans_dir.mkdir(exist_ok=True)
-        
-        # Create a filename based on the original audio filename
-        audio_filename = abs_audio_path.name
-        trans_filename = f"{Path(audio_filename).stem}.txt"
-        final_path = trans_dir / trans_filename
-        #print(f"Transcription will be saved to: {final_path}")
-        
-        return final_path
+        return transcription_cache.get_transcription_path(audio_path)
 
     def load_cached_transcription(self, trans_path):
         """Load transcription from cache if it exists."""
-        try:
-            if trans_path.exists():
-                with open(trans_path, 'r', encoding='utf-8') as f:
-                    return f.read().strip()
-        except Exception as e:
-            print(f"Error reading cached transcription: {e}")
-        return None
+        return transcription_cache.load_cached_transcription(trans_path)
 
     def save_transcription(self, trans_path, text):
         """Save transcription to cache."""
-        try:
-            with open(trans_path, 'w', encoding='utf-8') as f:
-                f.write(text)
-        except Exception as e:
-            print(f"Error saving transcription: {e}")
+        transcription_cache.save_transcription(trans_path, text)
 
+    def get_transcription(self, attachment):
+        """
+        Transkription eines Audio-/Video-Anhangs und ob es sich um ein Video handelt.
+        Reihenfolge: Transkription aus dem Export, Cache, erst dann transcribe_audio (ASR).
+        """
+        is_video = self.is_video_file(attachment.full_path or attachment.filename)
+        digest = self.media_digests.get(str(attachment.full_path)) if attachment.full_path else None
+        if digest in self.transcriptions_by_digest:
+            return self.transcriptions_by_digest[digest], is_video
+        text, source = transcription_cache.resolve_transcription(
+            attachment, self.transcribe_once)
+        if self.verbose and source:
+            print(f"Transcription source: {source}")
+        if digest and source != transcription_cache.SOURCE_EXPORT:
+            # Transkriptionen aus dem Export gehören zur Nachricht, nicht zum Dateiinhalt
+            self.transcriptions_by_digest[digest] = text
+        return text, is_video
+
+    def transcribe_once(self, file_path):
+        """transcribe_audio höchstens einmal je Datei und Lauf"""
+        key = str(file_path)
+        if key not in self.transcriptions_by_path:
+            self.transcriptions_by_path[key] = self.transcribe_audio(file_path)[0]
+        return self.transcriptions_by_path[key]
+
+    @timed("transcribe_audio")
     def transcribe_audio(self, file_path):
-        """Transcribe audio or video file using Whisper, with caching.
-        DEAKTIVIERT: Gibt immer None, False zurück, um PyAudio-Abhängigkeit zu vermeiden.
+        """Transcribe audio or video file using Whisper (caching via get_transcription).
+        Ohne Transcriber (--transcribe) deaktiviert: gibt None, False zurück.
         """
+        if self.transcriber is None:
+            if self.verbose:
+                print(f"Audio transcription disabled for: {file_path}")
+            return None, False
         if self.verbose:
-            print(f"Audio transcription disabled for: {file_path}")
-        return None, False
+            print(f"Transcribing: {file_path}")
+        return self.transcriber.transcribe(file_path), self.is_video_file(file_path)
     
+    @timed("embed_image")
     def embed_image(self, canvas, image_path, x, y, max_height, max_width):
         """Embed an image in the PDF with maximum height and width constraints."""
-        if not image_path or not os.path.exists(image_path):
+        if not image_path:
             print(f"Image not found: {image_path}")
             return 0
             
         try:
-            img = Image.open(image_path)
-            img_width, img_height = img.size
-            
-            # Calculate scale factors for both constraints
-            width_scale = max_width / img_width
-            height_scale = max_height / img_height
-            
-            # Use the smaller scale to ensure both constraints are met
-            scale = min(width_scale, height_scale, 1.0)
-            
-            # Calculate final dimensions
-            final_width = img_width * scale
-            final_height = img_height * scale
+            image_path = str(image_path)
+            source, final_width, final_height = self.prepare_image(image_path, max_width, max_height)
             
             # Check if we need a new page for the image
             if y - final_height < self.margin:
@@ -714,13 +566,130 @@ class ChatReport:
                 y = self.page_height - self.margin
             
             # Draw the image
-            canvas.drawImage(image_path, x, y - final_height, 
+            canvas.drawImage(source, x, y - final_height, 
                            width=final_width, height=final_height)
+            self.images_embedded += 1
+            count("images_embedded")
+            if metrics.enabled:
+                count("bytes_read", os.path.getsize(image_path))
             return final_height
+        except FileNotFoundError:
+            print(f"Image not found: {image_path}")
+            return 0
         except Exception as e:
             print(f"Error embedding image {image_path}: {e}")
             return 0
 
+    def prepare_image(self, image_path, max_width, max_height):
+        """
+        (Quelle, Breite, Höhe) eines Bildes der aktuellen Nachricht: vom Prefetcher, sonst selbst geladen.
+        Das Ergebnis wird bis zur nächsten Nachricht gemerkt, damit die Höhenberechnung in add_chat_line
+        und embed_image die Datei nicht jeweils erneut öffnen. Fehler beim Laden werden weitergereicht.
+        """
+        image_path = str(image_path)
+        if image_path not in self.prepared_images:
+            prepared = self.prefetcher.get(image_path) if self.prefetcher else None
+            if prepared is None:
+                prepared = self.load_image(image_path, max_width, max_height)
+            self.prepared_images[image_path] = prepared
+        return self.prepared_images[image_path]
+
+    def load_image(self, image_path, max_width, max_height, decode=False):
+        """
+        Öffnet ein Bild und berechnet seine Größe im PDF: (Quelle für drawImage, Breite, Höhe).
+        Mit `decode` werden die Bilddaten bereits hier gelesen (und verkleinerte Bilder dekodiert),
+        drawImage muss sie dann nur noch einbetten. So rufen die Threads des Prefetchers die Methode auf.
+        """
+        from PIL import Image
+        from reportlab.lib.utils import ImageReader
+
+        # Inhaltsgleiche Dateien über einen gemeinsamen Pfad, reportlab bettet sie dann nur einmal ein
+        image_path = self.canonical_media.get(image_path, image_path)
+        with Image.open(image_path) as img:
+            img_width, img_height = img.size
+            
+            # Use the smaller scale to ensure both constraints are met
+            scale = min(max_width / img_width, max_height / img_height, 1.0)
+            final_width = img_width * scale
+            final_height = img_height * scale
+            
+            source = self.downsample_image(img, image_path, final_width, final_height) if self.image_dpi else image_path
+        if decode:
+            if isinstance(source, ImageReader):
+                # reportlab bildet den Namen des Bildes aus den dekodierten Daten, der ImageReader behält sie
+                source.getRGBData()
+            else:
+                # Dateien bettet reportlab über den Pfad ein (JPEGs unverändert, gleiche Pfade nur einmal);
+                # vorab gelesen kommt die Datei dann aus dem Dateicache statt vom (Netz-)Laufwerk
+                with open(source, 'rb') as f:
+                    while f.read(1 << 20):
+                        pass
+        return source, final_width, final_height
+
+    def start_prefetch(self, image_paths, window=8, workers=4):
+        """
+        Lädt die Bilder `image_paths` (in der Reihenfolge, in der embed_image sie anfordert) in
+        Hintergrund-Threads voraus, höchstens `window` Bilder vor der aktuellen Nachricht.
+        """
+        from prefetch import Prefetcher
+        max_content_width = (self.page_width - 2 * self.margin - 200) - 20  # wie in add_chat_line
+        self.prefetcher = Prefetcher(
+            image_paths,
+            lambda path: self.load_image(path, max_content_width, self.max_image_height, decode=True),
+            window, workers)
+
+    def downsample_image(self, img, image_path, width, height):
+        """
+        Verkleinert ein Bild auf die Auflösung, mit der es im PDF erscheint (image_dpi).
+        reportlab hält eingebettete Bilder bis zum Speichern im Speicher, große Fotos
+        kosten so nur noch einen Bruchteil. Kleinere Bilder werden unverändert verwendet.
+        """
+        from PIL import Image
+        from reportlab.lib.utils import ImageReader
+
+        target = (max(1, math.ceil(width / 72 * self.image_dpi)), max(1, math.ceil(height / 72 * self.image_dpi)))
+        if img.width <= target[0] and img.height <= target[1]:
+            return image_path
+        img.draft('RGB', target)
+        resized = img.convert('RGB').resize(target, Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, 'JPEG', quality=85)
+        buffer.seek(0)
+        return ImageReader(buffer)
+
+    def wrap_text(self, text):
+        """
+        Bricht einen Text für die mittlere Spalte um (DejaVuSans 10, höchstens TEXT_WIDTH breit).
+        Häufige Texte ("ok", "[Empty message]", weitergeleitete Nachrichten) kommen aus dem Layout-Cache.
+        """
+        return self.layout_cache(text, 'DejaVuSans', 10, TEXT_WIDTH)
+
+    @staticmethod
+    def layout_text(text, font, size, max_width):
+        """
+        Zeilen und Höhe eines umbrochenen Textes. Wie bisher wird umbrochen, sobald die Zeile breiter
+        als `max_width` wird; ist schon das erste Wort zu breit, beginnt der Text mit einer Leerzeile.
+        """
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        lines = []
+        current_line = ""
+        for word in text.split():
+            test_line = current_line + " " + word if current_line else word
+            if sum(stringWidth(char, font, size) for char in test_line) > max_width:
+                lines.append(current_line)
+                current_line = word
+            else:
+                current_line = test_line
+        if current_line:
+            lines.append(current_line)
+        return TextLayout(tuple(lines), len(lines) * LINE_SPACING)
+
+    def layout_cache_stats(self):
+        """Trefferstatistik des Layout-Caches: (Treffer, Abfragen, Einträge)"""
+        info = self.layout_cache.cache_info()
+        return info.hits, info.hits + info.misses, info.currsize
+
     def calculate_text_width(self, canvas, text):
         """Calculate the width of text considering emojis."""
         width = 0
@@ -729,19 +698,13 @@ class ChatReport:
             width += canvas.stringWidth(char, canvas._fontname, 10)
         return width
 
-    def add_participants_header(self, canvas, participants_data):
+    def add_participants_header(self, canvas, chat):
         # Set initial position at the top of the page
         self.y_position = self.page_height - self.margin
         
         # Excel Dateiname ohne Endung
         canvas.setFont('DejaVuSans', 16)
-        if isinstance(participants_data, dict):
-            excel_name = Path(participants_data['excel_path']).stem
-            participants_list = participants_data['participants']
-        else:
-            # Legacy Format: participants_data ist direkt die Liste
-            excel_name = Path(participants_data[0].get('excel_path', '')).stem
-            participants_list = participants_data
+        excel_name = Path(chat.excel_path).stem
 
         # Zentriere den Dateinamen
         text_width = canvas.stringWidth(excel_name, 'DejaVuSans', 16)
@@ -756,10 +719,8 @@ class ChatReport:
         
         # Add participants
         canvas.setFont('DejaVuSans', 10)
-        for participant in participants_list:
-            name = participant.get('sender_name', '')
-            is_owner = participant.get('is_owner', False)
-            participant_text = f"{name} {'(OWNER)' if is_owner else ''}"
+        for participant in chat.participants:
+            participant_text = f"{participant.name} {'(OWNER)' if participant.is_owner else ''}"
             canvas.drawString(self.margin + 20, self.y_position, participant_text)
             self.y_position -= self.line_height
         
@@ -768,329 +729,392 @@ class ChatReport:
         canvas.line(self.margin, self.y_position, self.page_width - self.margin, self.y_position)
         self.y_position -= self.line_height * 2
 
-def generate_chat_report(excel_file, output_file='chat_report.pdf', verbose=False, model_name="medium"):
-    """Generate a PDF report from the Excel file."""
-    global attachment_found_counter, attachment_not_found_counter
-    
-    # Reset counters
-    attachment_found_counter = 0
-    attachment_not_found_counter = 0
-    
-    try:
-        # Lese die Excel-Datei
-        df, metadata = read_excel_file(excel_file)
+class PdfReportBackend(ReportBackend):
+    """
+    PDF-Ausgabe über ChatReport und reportlab.
+    reportlab hält alle Seiten und Bilder bis zum Speichern im Speicher. Mit `pages_per_volume`
+    wird der Report deshalb in Bände aufgeteilt (<output>_001.pdf, <output>_002.pdf, ...), von
+    denen jeder gespeichert und freigegeben wird, sobald er mindestens so viele Seiten hat.
+    Die Seitenzahlen laufen über alle Bände durch.
+    Mit `prefetch` werden die nächsten Bilder in Hintergrund-Threads gelesen und dekodiert,
+    während die vorherigen Nachrichten gezeichnet werden (siehe prefetch.Prefetcher).
+
+    Nach jedem gespeicherten Band wird der Stand in <output>.checkpoint.json gesichert (nächste
+    Nachricht, Seitenzahl, Zähler von ChatReport, fertige Bände), die Seiten je Nachricht werden
+    an <output>.checkpoint.pages angehängt. resume() setzt einen abgebrochenen
+    Lauf dort mit dem nächsten Band fort; nach erfolgreichem Abschluss wird die Datei gelöscht.
+    Transkriptionen liegen ohnehin im Transkriptions-Cache und werden nicht wiederholt.
+    """
+    CHECKPOINT_VERSION = 1
+    name = "pdf"
+    extension = ".pdf"
+
+    def __init__(self, output_file, verbose=False, model_name="medium", pages_per_volume=None, image_dpi=None,
+                 media_digests=None, prefetch=None, prefetch_workers=4,
+                 layout_cache_size=DEFAULT_LAYOUT_CACHE_SIZE, transcriber=None):
+        super().__init__(output_file, verbose)
+        self.model_name = model_name
+        self.media_digests = media_digests
+        self.pages_per_volume = pages_per_volume
+        self.image_dpi = image_dpi
+        self.prefetch = prefetch
+        self.prefetch_workers = prefetch_workers
+        self.layout_cache_size = layout_cache_size
+        self.transcriber = transcriber
+        self.volumes = []        # gespeicherte Dateien
+        self.saved_bytes = 0
+        self.checkpoint_due = False  # Band gespeichert, Stand noch nicht gesichert
+        self.checkpointed_index = 0  # Seiten bis zu dieser Nachricht stehen bereits in der .pages-Datei
+
+    def volume_path(self, number):
+        if not self.pages_per_volume:
+            return self.output_file
+        return self.output_file.with_name(f"{self.output_file.stem}_{number:03d}{self.output_file.suffix}")
+
+    def open_volume(self):
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
+        self.canvas = canvas.Canvas(str(self.volume_path(len(self.volumes) + 1)), pagesize=A4)
+        self.volume_first_page = self.report.current_page
+        self.report.add_page_number(self.canvas)
+
+    def save_volume(self):
+        self.canvas.save()
+        path = self.volume_path(len(self.volumes) + 1)
+        self.volumes.append(path)
+        self.saved_bytes += os.path.getsize(path)
+        self.canvas = None
+        self.checkpoint_due = True
+
+    def begin(self, chat):
+        register_fonts()
+        self.report = ChatReport(verbose=self.verbose, model_name=self.model_name, image_dpi=self.image_dpi,
+                                 media_digests=self.media_digests, layout_cache_size=self.layout_cache_size,
+                                 transcriber=self.transcriber)
+        if self.prefetch:
+            self.report.start_prefetch(self.image_paths(chat), self.prefetch, self.prefetch_workers)
+        self.fingerprint = self.checkpoint_fingerprint(chat)
+        if self.pages_per_volume and self.pages_path.exists():
+            self.pages_path.unlink()  # von einem früheren, nicht fortgesetzten Lauf
         
-        if df is None:
-            print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
-            return
-            
-        if verbose:
-            print(f"Generiere PDF-Report: {output_file}")
-            print(f"Excel-Datei: {excel_file}")
-            print(f"Whisper-Modell: {model_name}")
-            print(f"DataFrame Spalten: {len(df.columns)}")
-            print(f"DataFrame Zeilen: {len(df)}")
-            
-        # Initialisiere den PDF-Report
-        c = canvas.Canvas(output_file, pagesize=A4)
-        report = ChatReport(verbose=verbose, model_name=model_name)
+        # Initialisiere die erste Seite mit Seitennummer
+        self.open_volume()
         
-        # Spaltenindizes bestimmen (mit Fallback-Werten)
-        from_col_idx = 1  # Standard: Spalte 1 für 'From'
-        body_col_idx = 8  # Standard: Spalte 8 für 'Body'
-        status_col_idx = 9  # Standard: Spalte 9 für 'Status'
-        date_col_idx = 17  # Standard: Spalte 17 für 'Timestamp-Date'
-        time_col_idx = 18  # Standard: Spalte 18 für 'Timestamp-Time'
-        direction_col_idx = 6  # Standard: Spalte 6 für 'Direction'
-        attachment_col_idx = 25  # Standard: Spalte 25 für 'Attachment #1'
-    
-    # Add participants header
-    participants_data = {
-        'excel_path': str(chat_data.excel_path),
-        'participants': [
-            {'sender_name': p.name, 'is_owner': p.is_owner}
-            for p in chat_data.participants
-        ]
-    }
-    report.add_participants_header(c, participants_data)
-    
-    # Process each message
-    for msg in chat_data.messages:
-        message_data = {
-            'sender_name': msg.sender.name,
-            'body': msg.body or '[Empty message]',
-            'timestamp': msg.timestamp.strftime('%d.%m.%Y %H:%M:%S'),
-            'is_owner': msg.sender.is_owner,
-            'Status': msg.status
+        # Füge Teilnehmerliste hinzu
+        self.report.add_participants_header(self.canvas, chat)
+
+    def image_paths(self, chat, start=0):
+        """Die Bildpfade in der Reihenfolge, in der add_chat_line sie einbettet"""
+        for index in range(start, len(chat.messages)):
+            message = chat.messages[index]
+            attachment = message.attachment
+            if (message.sender is not UNKNOWN_PARTICIPANT and attachment and attachment.filename
+                    and attachment.type != AttachmentType.URL and attachment.full_path
+                    and self.report.is_image_file(attachment.full_path)):
+                yield str(attachment.full_path)
+
+    def add_message(self, index, message):
+        self.report.add_chat_line(self.canvas, message)
+        page = self.report.message_start_page
+        if self.pages_per_volume and self.report.current_page - self.volume_first_page + 1 >= self.pages_per_volume:
+            # Band abschließen, der nächste beginnt auf einer neuen Seite
+            self.save_volume()
+            self.report.current_page += 1
+            self.report.total_pages = self.report.current_page
+            self.report.y_position = self.report.page_height - self.report.margin
+            self.open_volume()
+        return page
+
+    def finish(self):
+        if self.report.prefetcher:
+            self.report.prefetcher.close()
+        self.save_volume()
+        hits, lookups, entries = self.report.layout_cache_stats()
+        count("layout_cache_hits", hits)
+        count("layout_cache_lookups", lookups)
+        if self.verbose and lookups:
+            print(f"Layout-Cache: {hits} von {lookups} Texten wiederverwendet ({hits / lookups:.1%}), "
+                  f"{entries} Einträge")
+        if self.pages_per_volume:
+            print(f"{len(self.volumes)} Bände geschrieben: {self.volumes[0]} ... {self.volumes[-1]}")
+            for path in (self.checkpoint_path, self.pages_path):
+                if path.exists():
+                    path.unlink()
+
+    def output_files(self):
+        # Mit Bänden entsteht die Datei `output_file` selbst nicht
+        return list(self.volumes)
+
+    @property
+    def checkpoint_path(self):
+        return self.output_file.with_name(self.output_file.name + '.checkpoint.json')
+
+    @property
+    def pages_path(self):
+        return self.output_file.with_name(self.output_file.name + '.checkpoint.pages')
+
+    def checkpoint_fingerprint(self, chat):
+        """Merkmale von Export und Optionen, zu denen ein Checkpoint passen muss"""
+        path = Path(chat.excel_path).resolve()
+        try:
+            stat = os.stat(path)
+            source = [str(path), stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            source = [str(path)]
+        return {
+            "version": self.CHECKPOINT_VERSION,
+            "source": source,
+            "messages": chat.message_count,
+            "filter": chat.metadata.get("filter"),
+            "pages_per_volume": self.pages_per_volume,
+            "image_dpi": self.image_dpi,
+            "media_digests": bool(self.media_digests),
         }
-        
-        # Handle attachment if present
-        if msg.attachment:
-            message_data['attachment'] = msg.attachment.filename
-            if msg.attachment.full_path:
-                message_data['attachment_path'] = str(msg.attachment.full_path)
-                if msg.attachment.type == 'audio' and msg.attachment.transcription:
-                    message_data['audio_transcription'] = msg.attachment.transcription
-        
-        report.add_chat_line(c, message_data)
-    
-    # Save the PDF
-    c.save()
-    
-    # Print attachment statistics
-    stats = chat_data.attachment_stats
-    print(f"Attachments found: {stats['found']}")
-    if stats['not_found'] > 0:
-        print(f"Attachments not found: {stats['not_found']}")
 
-def generate_chat_report(excel_file, output_file='chat_report.pdf', verbose=False, model_name="medium"):
-    """Generate a PDF report from the Excel file."""
-    global attachment_found_counter, attachment_not_found_counter
-    
-    # Reset counters
-    attachment_found_counter = 0
-    attachment_not_found_counter = 0
-    
-    try:
-        # Lese die Excel-Datei
-        df, metadata = read_excel_file(excel_file)
-        
-        if df is None:
-            print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
+    def checkpoint(self, next_index, pages):
+        if not self.checkpoint_due:
             return
-            
+        self.checkpoint_due = False
+        # Nur die seit dem letzten Checkpoint hinzugekommenen Seiten anhängen, der Checkpoint
+        # merkt sich die gültige Länge der Datei
+        new_pages = {index: pages[index] for index in range(self.checkpointed_index, next_index) if index in pages}
+        with open(self.pages_path, 'ab') as f:
+            f.write(json.dumps(new_pages).encode('utf-8') + b"\n")
+            pages_size = f.tell()
+        self.checkpointed_index = next_index
+        state = {
+            "fingerprint": self.fingerprint,
+            "next_index": next_index,
+            "current_page": self.report.current_page,
+            "total_pages": self.report.total_pages,
+            "message_count": self.report.message_count,
+            "images_embedded": self.report.images_embedded,
+            "volumes": [str(path) for path in self.volumes],
+            "saved_bytes": self.saved_bytes,
+            "pages_size": pages_size,
+        }
+        # Erst vollständig schreiben, dann ersetzen: ein Abbruch hinterlässt nie einen halben Checkpoint
+        temp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def load_checkpoint(self, chat):
+        """Gespeicherter Stand, wenn er zu Export, Optionen und vorhandenen Bänden passt, sonst None"""
+        if not self.pages_per_volume:
+            print("Fortsetzen ist nur mit --pages-per-volume möglich, beginne von vorn")
+            return None
+        if not self.checkpoint_path.exists():
+            print(f"Kein Checkpoint gefunden ({self.checkpoint_path}), beginne von vorn")
+            return None
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warnung: Checkpoint konnte nicht gelesen werden: {e}")
+            return None
+        if state.get("fingerprint") != self.checkpoint_fingerprint(chat):
+            print("Checkpoint passt nicht zu diesem Export oder diesen Optionen, beginne von vorn")
+            return None
+        missing = [path for path in state["volumes"] + [str(self.pages_path)] if not os.path.exists(path)]
+        if missing:
+            print(f"Bände des Checkpoints fehlen ({missing[0]}), beginne von vorn")
+            return None
+        return state
+
+    def resume(self, chat):
+        state = self.load_checkpoint(chat)
+        if state is None:
+            return None
+        register_fonts()
+        self.report = ChatReport(verbose=self.verbose, model_name=self.model_name, image_dpi=self.image_dpi,
+                                 media_digests=self.media_digests, layout_cache_size=self.layout_cache_size,
+                                 transcriber=self.transcriber)
+        self.report.current_page = state["current_page"]
+        self.report.total_pages = state["total_pages"]
+        self.report.message_count = state["message_count"]
+        self.report.images_embedded = state["images_embedded"]
+        self.volumes = [Path(path) for path in state["volumes"]]
+        self.saved_bytes = state["saved_bytes"]
+        self.fingerprint = state["fingerprint"]
+        if self.prefetch:
+            self.report.start_prefetch(self.image_paths(chat, state["next_index"]), self.prefetch,
+                                       self.prefetch_workers)
+        self.open_volume()
+
+        # Seiten bis zum Checkpoint; was danach noch angehängt wurde, gehört zum verworfenen Band
+        pages = {}
+        with open(self.pages_path, 'rb+') as f:
+            for line in f.read(state["pages_size"]).splitlines():
+                pages.update((int(index), page) for index, page in json.loads(line).items())
+            f.truncate(state["pages_size"])
+        self.checkpointed_index = state["next_index"]
+        return state["next_index"], pages
+
+    def progress_stats(self):
+        # reportlab hält den aktuellen Band bis zum Speichern im Speicher, gezählt werden gespeicherte Bände
+        bytes_out = self.saved_bytes if self.volumes else None
+        return {"pages": self.report.current_page, "images": self.report.images_embedded, "bytes_out": bytes_out}
+
+REPORT_BACKENDS = {PdfReportBackend.name: PdfReportBackend, **BACKENDS}
+
+def create_backend(report_format, output_file, verbose=False, model_name="medium", thumbnails=False,
+                   pages_per_volume=None, image_dpi=None, media_digests=None, prefetch=None,
+                   layout_cache_size=DEFAULT_LAYOUT_CACHE_SIZE, transcriber=None):
+    """Erzeugt das ReportBackend für ein Ausgabeformat (pdf, html, jsonl)"""
+    if report_format == 'pdf':
+        return PdfReportBackend(output_file, verbose, model_name, pages_per_volume, image_dpi, media_digests,
+                                prefetch, layout_cache_size=layout_cache_size, transcriber=transcriber)
+    if report_format == 'html':
+        return HtmlReportBackend(output_file, verbose, thumbnails=thumbnails)
+    return BACKENDS[report_format](output_file, verbose)
+
+def generate_chat_report(excel_file, output_file='chat_report.pdf', verbose=False, model_name="medium", chat=None,
+                         search_index_path=None, report_format='pdf', thumbnails=False, progress=None,
+                         pages_per_volume=None, image_dpi=None, media_digests=None, prefetch=None,
+                         message_filter=None, resume=False, layout_cache_size=DEFAULT_LAYOUT_CACHE_SIZE,
+                         transcriber=None):
+    """
+    Generate a report (PDF, HTML or JSONL) from the Excel file.
+    Liefert die geschriebenen Dateien (bei Bänden <output>_001.pdf, ...), None wenn der Export nicht lesbar ist.
+    Ein bereits eingelesener ChatExport kann über `chat` übergeben werden, um die Datei nicht erneut zu lesen.
+    Mit `search_index_path` wird zusätzlich ein Suchindex inkl. Seitenzahlen (nur PDF) geschrieben.
+    `progress` ('text' oder 'json') aktiviert die Fortschrittsanzeige auf stderr.
+    `pages_per_volume` und `image_dpi` begrenzen beim PDF den Speicherbedarf (siehe PdfReportBackend).
+    `media_digests` (media_hash.hash_attachments) lässt inhaltsgleiche Anhänge nur einmal verarbeiten.
+    `prefetch` ist die Anzahl Bilder, die beim PDF im Hintergrund vorausgeladen werden (None = aus).
+    `message_filter` (models.MessageFilter) wählt beim Einlesen die Nachrichten aus, wenn `chat` fehlt.
+    Mit `resume` wird ein abgebrochener Lauf am letzten Checkpoint fortgesetzt (PDF mit `pages_per_volume`).
+    `layout_cache_size` begrenzt den Cache für umbrochene Nachrichtentexte (0 = aus).
+    `transcriber` (asr.WhisperTranscriber) transkribiert beim PDF Audio ohne Transkription (None = aus).
+    """
+    try:
+        if chat is None:
+            from functions import resolve_attachments
+            chat = get_reader(excel_file).read(excel_file, message_filter)
+            resolve_attachments(chat)
+    except ValueError as e:
+        print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
         if verbose:
-            print(f"Generiere PDF-Report: {output_file}")
-            print(f"Excel-Datei: {excel_file}")
-            print(f"Whisper-Modell: {model_name}")
-            print(f"DataFrame Spalten: {len(df.columns)}")
-            print(f"DataFrame Zeilen: {len(df)}")
-            
-        # Initialisiere den PDF-Report
-        c = canvas.Canvas(output_file, pagesize=A4)
-        report = ChatReport(verbose=verbose, model_name=model_name)
+            print(e)
+        return
         
-        # Spaltenindizes bestimmen (mit Fallback-Werten)
-        from_col_idx = 1  # Standard: Spalte 1 für 'From'
-        body_col_idx = 8  # Standard: Spalte 8 für 'Body'
-        status_col_idx = 9  # Standard: Spalte 9 für 'Status'
-        date_col_idx = 17  # Standard: Spalte 17 für 'Timestamp-Date'
-        time_col_idx = 18  # Standard: Spalte 18 für 'Timestamp-Time'
-        direction_col_idx = 6  # Standard: Spalte 6 für 'Direction'
-        attachment_col_idx = 25  # Standard: Spalte 25 für 'Attachment #1'
-    
-        # Sichere Funktion zum Abrufen von Zellwerten innerhalb der generate_chat_report-Funktion
-        def safe_get_cell_local(row, idx, default=''):
-            try:
-                if idx < len(row):
-                    value = str(row.iloc[idx]).strip()
-                    return value if value != 'nan' else default
-                return default
-            except Exception as e:
-                if verbose:
-                    print(f"Fehler beim Lesen der Zelle {idx}: {e}")
-                return default
-                
-        # Überprüfe die Spaltenanzahl und passe die Indizes an
-        if len(df.columns) <= attachment_col_idx:
-            # Wenn weniger Spalten vorhanden sind, suche nach Spalten mit bestimmten Namen
-            if verbose:
-                print("Spaltenanzahl kleiner als erwartet, suche nach Spalten anhand der Namen...")
-                
-            for i, col_name in enumerate(df.columns):
-                col_name_lower = str(col_name).lower()
-                if 'from' in col_name_lower:
-                    from_col_idx = i
-                    if verbose:
-                        print(f"'From'-Spalte gefunden: {i}")
-                elif 'body' in col_name_lower:
-                    body_col_idx = i
-                    if verbose:
-                        print(f"'Body'-Spalte gefunden: {i}")
-                elif 'status' in col_name_lower:
-                    status_col_idx = i
-                    if verbose:
-                        print(f"'Status'-Spalte gefunden: {i}")
-                elif 'date' in col_name_lower:
-                    date_col_idx = i
-                    if verbose:
-                        print(f"'Date'-Spalte gefunden: {i}")
-                elif 'time' in col_name_lower:
-                    time_col_idx = i
-                    if verbose:
-                        print(f"'Time'-Spalte gefunden: {i}")
-                elif 'direction' in col_name_lower:
-                    direction_col_idx = i
-                    if verbose:
-                        print(f"'Direction'-Spalte gefunden: {i}")
-                elif 'attachment' in col_name_lower:
-                    attachment_col_idx = i
-                    if verbose:
-                        print(f"'Attachment'-Spalte gefunden: {i}")
-                
     if verbose:
-        print(f"Verwendete Spaltenindizes:")
-        print(f"  From: {from_col_idx}")
-        print(f"  Body: {body_col_idx}")
-        print(f"  Status: {status_col_idx}")
-        print(f"  Date: {date_col_idx}")
-        print(f"  Time: {time_col_idx}")
-        print(f"  Direction: {direction_col_idx}")
-        print(f"  Attachment: {attachment_col_idx}")
-    
-    # Parse participants
-    participants_dict = {}
-    image_attachments = []
-    
-    # Iterate through rows to find participants
-    for _, row in df.iloc[1:].iterrows():
-        try:
-            from_field = safe_get_cell(row, from_col_idx)
-            chat_id, name = parse_participant(from_field)
-            
-            if chat_id and chat_id not in participants_dict:
-                participants_dict[chat_id] = {
-                    'name': name,
-                    'is_owner': False
-                }
-            
-            # Check for attachments
-            attachment = safe_get_cell(row, attachment_col_idx)
-            if attachment != 'nan' and attachment:
-                attachment_path = find_attachment_file(excel_file, attachment)
-                if attachment_path and report.is_image_file(attachment_path):
-                    image_attachments.append(attachment_path)
-            
-            # Check for owner
-            direction = safe_get_cell(row, direction_col_idx).lower()
-            
-            if direction == 'outgoing':
-                if chat_id and chat_id in participants_dict:
-                    participants_dict[chat_id]['is_owner'] = True
-        except Exception as e:
-            if verbose:
-                print(f"Fehler bei der Verarbeitung einer Zeile: {e}")
-    
-    if image_attachments and verbose:
-        print(f"\nFound {len(image_attachments)} image attachments in chat:")
-        for img in image_attachments:
-            print(f"- {img}")
-    
-    # Convert participants_dict to list for header
-    participants = []
-    for info in participants_dict.values():
-        participants.append({
-            'sender_name': info['name'],
-            'is_owner': info['is_owner']
-        })
-    
-    # Add participants header
-    report.add_participants_header(c, participants)
-    
-    # Process the messages
-    messages = []
-    for _, row in df.iloc[1:].iterrows():
-        from_field = str(row.iloc[1]).strip()
-        chat_id, name = parse_participant(from_field)
+        print(f"Generiere {report_format.upper()}-Report: {output_file}")
+        print(f"Excel-Datei: {excel_file}")
+        print(f"Whisper-Modell: {transcriber.describe() if transcriber else model_name}")
+        print(f"Nachrichten: {chat.message_count}")
+        print(f"Teilnehmer: {len(chat.participants)}")
         
-        if chat_id and chat_id in participants_dict:
-            # Get body content first
-            body_content = str(row.iloc[8]).strip()  # Body is in column 8
-            status = str(row.iloc[9]).strip()  # Status is in column 9
-            attachment = str(row.iloc[25]).strip()  # Attachment #1 is in column 25
-            
-            # Check for attachment if body is empty
-            if body_content == 'nan' or not body_content:
-                if attachment != 'nan' and attachment:
-                    attachment_path = find_attachment_file(excel_file, attachment)
-                    if attachment_path:
-                        body_content = ""  # Don't set body content, we'll display attachment separately
-                    else:
-                        body_content = f"[Missing Attachment: {attachment}]"
-                else:
-                    body_content = "[Empty message]"
-            
-            # Get timestamp from Timestamp-Time column
-            timestamp = str(row.iloc[18]).strip()
-            # Remove (UTC+0) if present
-            timestamp = timestamp.replace('(UTC+0)', '').strip()
-            # Check if timestamp contains a date
-            if '.' not in timestamp:
-                # If no date, get it from Timestamp-Date column
-                date = str(row.iloc[17]).strip()
-                if date != 'nan' and date:
-                    timestamp = f"{date} {timestamp}"
-            
-            # Check direction for owner detection
-            direction = str(row.iloc[6]).strip().lower()
-            is_owner = direction == 'outgoing'
-            
-            message_data = {
-                'sender_name': name,
-                'body': body_content,
-                'timestamp': timestamp,
-                'is_owner': is_owner,
-                'Status': status,
-                'attachment': attachment
-            }
-            
-            # Add full path to attachment if it exists
-            if attachment and attachment != 'nan':
-                attachment_path = find_attachment_file(excel_file, attachment)
-                if attachment_path:
-                    message_data['attachment_path'] = attachment_path
-                    # Wenn es eine Audio-Datei ist, füge Transkription hinzu
-                    if report.is_audio_file(attachment_path):
-                        transcription = report.transcribe_audio(attachment_path)
-                        message_data['audio_transcription'] = transcription
-            
-            messages.append(message_data)
-    
-    # Initialisiere die erste Seite mit Seitennummer
-    report.add_page_number(c)
+    backend = create_backend(report_format, output_file, verbose, model_name, thumbnails,
+                             pages_per_volume, image_dpi, media_digests, prefetch, layout_cache_size, transcriber)
+    start_index, pages = 0, {}
+    restored = backend.resume(chat) if resume else None
+    if restored is not None:
+        start_index, pages = restored
+        print(f"Setze beim Checkpoint fort: Nachricht {start_index + 1} von {chat.message_count}, "
+              f"Seite {backend.progress_stats().get('pages')}")
+    else:
+        if resume and not isinstance(backend, PdfReportBackend):
+            print(f"Das Format {report_format} kann nicht fortgesetzt werden, beginne von vorn")
+        backend.begin(chat)
     
-    # Sammle Teilnehmer und füge Excel-Pfad hinzu
-    participants = {
-        'excel_path': excel_file,
-        'participants': []
-    }
-    seen = set()
-    for message in messages:
-        sender_name = message.get('sender_name')
-        if sender_name and sender_name not in seen:
-            seen.add(sender_name)
-            participants['participants'].append({
-                'sender_name': sender_name,
-                'is_owner': message.get('is_owner', False)
-            })
+    reporter = None
+    if progress:
+        from progress import ProgressReporter
+        reporter = ProgressReporter(chat.message_count, mode=progress, stats=backend.progress_stats,
+                                    start=start_index)
     
-    # Füge Teilnehmerliste hinzu
-    report.add_participants_header(c, participants)
+    # Process each message, Zeilen ohne auswertbaren Absender werden übersprungen
+    for index in range(start_index, len(chat.messages)):
+        message = chat.messages[index]
+        if message.sender is not UNKNOWN_PARTICIPANT:
+            page = backend.add_message(index, message)
+            if page is not None:
+                pages[index] = page
+        backend.checkpoint(index + 1, pages)
+        if reporter is not None:
+            reporter.update(index + 1)
     
-    # Process each message
-    for message in messages:
-        report.add_chat_line(c, message)
+    # Save the report mit dem angegebenen Ausgabepfad
+    with timer("save"):
+        backend.finish()
+    if reporter is not None:
+        reporter.finish()
     
-    # Save the PDF mit dem angegebenen Ausgabepfad
-    c.save()
+    if search_index_path:
+        from search_index import SearchIndex
+        with SearchIndex(search_index_path) as index:
+            index.build(chat, pages)
+        print(f"Suchindex geschrieben: {search_index_path}")
     
     # Print attachment statistics
-    print(f"Attachments found: {attachment_found_counter}")
-    if attachment_not_found_counter > 0:
-        print(f"Attachments not found: {attachment_not_found_counter}")
+    stats = chat.attachment_stats
+    print(f"Attachments found: {stats['found']}")
+    if stats['not_found'] > 0:
+        print(f"Attachments not found: {stats['not_found']}")
+    return backend.output_files()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analysiere WhatsApp-Export Excel-Datei und generiere optional einen PDF-Report.')
     parser.add_argument('excel_file', type=str, help='Pfad zur Excel-Datei')
     parser.add_argument('--export', '-e', action='store_true',
                        help='PDF-Report generieren (standardmäßig wird nur die Statistik angezeigt)')
-    parser.add_argument('--output', '-o', type=str, default='chat_report.pdf',
-                       help='Pfad zur Ausgabe-PDF-Datei (Standard: chat_report.pdf)')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                       help='Pfad zur Ausgabedatei (Standard: chat_report.pdf bzw. .html/.jsonl)')
+    parser.add_argument('--format', '-f', dest='report_format', choices=list(REPORT_BACKENDS), default='pdf',
+                       help='Ausgabeformat des Reports; html und jsonl schreiben Nachricht für Nachricht '
+                            'und betten keine Bilder ein (Standard: pdf)')
+    parser.add_argument('--progress', nargs='?', const='text', default=None, choices=['text', 'json'],
+                       help='Fortschritt beim Export auf stderr anzeigen; "json" schreibt maschinenlesbare Zeilen')
+    parser.add_argument('--pages-per-volume', type=int, default=None, metavar='N',
+                       help='PDF in Bände zu je mindestens N Seiten aufteilen (<output>_001.pdf, ...), '
+                            'begrenzt den Speicherbedarf bei sehr großen Chats')
+    parser.add_argument('--resume', action='store_true',
+                       help='Abgebrochenen PDF-Export am letzten Checkpoint fortsetzen (nur mit --pages-per-volume; '
+                            'nach jedem Band wird <output>.checkpoint.json geschrieben)')
+    parser.add_argument('--image-dpi', type=int, default=None, metavar='DPI',
+                       help='PDF: Bilder vor dem Einbetten auf diese Auflösung verkleinern (z.B. 150)')
+    parser.add_argument('--prefetch', type=int, nargs='?', const=8, default=None, metavar='N',
+                       help='PDF: die nächsten N Bilder in Hintergrund-Threads lesen und dekodieren, '
+                            'während gezeichnet wird (Standard: 8)')
+    parser.add_argument('--layout-cache', type=int, default=DEFAULT_LAYOUT_CACHE_SIZE, metavar='N',
+                       help='PDF: Umbruch der letzten N verschiedenen Texte zwischenspeichern, 0 schaltet den '
+                            f'Cache ab (Standard: {DEFAULT_LAYOUT_CACHE_SIZE})')
+    parser.add_argument('--thumbnails', action='store_true',
+                       help='HTML: verkleinerte Bildkopien statt Verweisen auf die Originalbilder verwenden')
     parser.add_argument('-v', '--verbose', action='store_true',
                        help='Ausführliche Ausgabe aktivieren')
     parser.add_argument('--model', '-m', type=str, default='medium',
                        choices=['tiny', 'base', 'small', 'medium', 'large'],
                        help='Whisper-Modell für die Transkription (Standard: medium)')
+    parser.add_argument('--transcribe', action='store_true',
+                       help='PDF: Audio/Video ohne vorhandene Transkription mit Whisper auf der CPU transkribieren '
+                            '(benötigt openai-whisper und torch)')
+    parser.add_argument('--quantize', choices=['int8', 'fp32'], default='int8',
+                       help='Mit --transcribe: Linear-Schichten dynamisch auf int8 quantisieren (schneller auf der CPU) '
+                            'oder unverändert fp32 rechnen; scheitert int8, wird fp32 verwendet (Standard: int8)')
+    parser.add_argument('--torch-threads', type=int, default=None, metavar='N',
+                       help='Mit --transcribe: Anzahl Torch-Threads je Prozess (Standard: automatisch)')
+    parser.add_argument('--search-index', nargs='?', const='', default=None, metavar='INDEX',
+                       help='Beim Export einen Suchindex mit Seitenzahlen schreiben (Standard: <excel_file>.search.db)')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='JSON',
+                       help='Laufzeiten und Zähler je Verarbeitungsschritt ausgeben, optional zusätzlich als JSON-Datei')
+    parser.add_argument('--profile-cpu', nargs='?', const='profile', default=None, metavar='PREFIX',
+                       help='Pipeline mit cProfile messen, je Abschnitt (ingest/stats/render) eine Datei '
+                            'PREFIX.<abschnitt>.prof schreiben (Standard-PREFIX: profile)')
+    parser.add_argument('--profile-mem', nargs='?', type=int, const=10, default=None, metavar='N',
+                       help='Speicherallokationen mit tracemalloc je Abschnitt messen und die N größten '
+                            'Allokationsstellen ausgeben (Standard: 10)')
+    parser.add_argument('--scan-workers', type=int, default=None, metavar='N',
+                       help='Anhangsverzeichnisse einmal mit N Threads indizieren statt je Anhang zu durchsuchen '
+                            '(empfohlen für Netzlaufwerke)')
+    parser.add_argument('--hash-media', action='store_true',
+                       help='Anhänge parallel hashen, doppelte Medien ausgeben und beim Export nur einmal verarbeiten')
+    parser.add_argument('--columnar', action='store_true',
+                       help='Nachrichten spaltenweise (NumPy) im Speicher halten, spart Speicher bei großen Exporten')
+    from functions import add_filter_arguments
+    add_filter_arguments(parser)
     
     args = parser.parse_args()
     
@@ -1099,19 +1123,72 @@ if __name__ == "__main__":
         print(f"Fehler: Die Datei '{args.excel_file}' existiert nicht.")
         sys.exit(1)
     
-    # Lese die Excel-Datei mit der neuen Funktion
-    df, metadata = read_excel_file(args.excel_file)
+    if args.profile is not None:
+        metrics.enabled = True
     
-    if df is None:
-        print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
-        sys.exit(1)
+    # Abschnittsweise Profilierung (ingest/stats/render), ohne --profile-cpu/--profile-mem wirkungslos
+    profiler = StageProfiler(args.profile_cpu, args.profile_mem)
+    
+    # Lese die Excel-Datei einmal ein, Statistik und PDF-Report verwenden denselben ChatExport
+    from functions import generate_statistics, message_filter_from_args, resolve_attachments
+    with profiler.stage("ingest"):
+        try:
+            chat = get_reader(args.excel_file).read(args.excel_file, message_filter_from_args(args))
+        except ValueError:
+            print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
+            sys.exit(1)
+        resolve_attachments(chat, scan_workers=args.scan_workers)
+        if args.columnar:
+            chat.to_columnar()
     
     # Zeige Statistiken an (immer)
-    stats = generate_statistics(df, metadata, args.excel_file, args.verbose)
+    with profiler.stage("stats"):
+        stats = generate_statistics(chat, args.verbose)
     print(stats)
     
+    media_digests = None
+    if args.hash_media:
+        from media_hash import default_cache_path, find_duplicates, format_duplicate_report, hash_attachments
+        with profiler.stage("hash"):
+            media_sizes = {}
+            media_digests = hash_attachments(chat, default_cache_path(args.excel_file), sizes=media_sizes)
+        print()
+        print(format_duplicate_report(find_duplicates(chat, media_digests, media_sizes)))
+    
     # Wenn PDF-Report generiert werden soll
     if args.export:
-        print("\nGeneriere PDF-Report...")
-        generate_chat_report(args.excel_file, args.output, args.verbose, args.model)
-        print(f"PDF-Report wurde generiert: {args.output}")
+        output_file = args.output or f"chat_report{REPORT_BACKENDS[args.report_format].extension}"
+        print(f"\nGeneriere {args.report_format.upper()}-Report...")
+        search_index_path = None
+        if args.search_index is not None:
+            from search_index import default_index_path
+            search_index_path = args.search_index or default_index_path(args.excel_file)
+        transcriber = None
+        if args.transcribe:
+            from asr import WhisperTranscriber
+            transcriber = WhisperTranscriber(args.model, args.quantize, args.torch_threads)
+        with profiler.stage("render"):
+            written = generate_chat_report(args.excel_file, output_file, args.verbose, args.model, chat=chat,
+                                           search_index_path=search_index_path, report_format=args.report_format,
+                                           thumbnails=args.thumbnails, progress=args.progress,
+                                           pages_per_volume=args.pages_per_volume, image_dpi=args.image_dpi,
+                                           media_digests=media_digests, prefetch=args.prefetch, resume=args.resume,
+                                           layout_cache_size=args.layout_cache, transcriber=transcriber)
+        if len(written) == 1:
+            print(f"{args.report_format.upper()}-Report wurde generiert: {written[0]}")
+        else:
+            print(f"{args.report_format.upper()}-Report wurde in {len(written)} Bänden generiert:")
+            for path in written:
+                print(f"  {path}")
+    
+    if args.profile is not None:
+        print()
+        print(metrics.format_table())
+        if args.profile:
+            metrics.write_json(args.profile)
+            print(f"Profil gespeichert: {args.profile}")
+    
+    if args.profile_cpu or args.profile_mem:
+        profiler.stop()
+        print()
+        print(profiler.format_report())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import contextlib
+import cProfile
+import functools
+import json
+import math
+import time
+import tracemalloc
+
+class Metrics:
+    """
+    Sammelt Laufzeiten (je Aufruf) und Zähler der einzelnen Verarbeitungsschritte.
+    Solange die Messung nicht aktiviert ist, kosten timer() und count() nur eine Abfrage.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.timings = {}
+        self.counters = {}
+
+    def reset(self):
+        self.timings.clear()
+        self.counters.clear()
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Misst die Laufzeit des Blocks unter `name`"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.setdefault(name, []).append(time.perf_counter() - start)
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """Kennzahlen je Messpunkt: Aufrufe, Gesamt-, Durchschnitts- und p95-Zeit in Sekunden"""
+        result = {}
+        for name, durations in self.timings.items():
+            ordered = sorted(durations)
+            result[name] = {
+                "calls": len(ordered),
+                "total": sum(ordered),
+                "avg": sum(ordered) / len(ordered),
+                "p95": ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)],
+            }
+        return result
+
+    def format_table(self):
+        lines = ["=== Profil ===",
+                 f"{'Messpunkt':24} {'Aufrufe':>9} {'Gesamt':>10} {'Mittel':>10} {'p95':>10}"]
+        for name, values in sorted(self.summary().items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"{name:24} {values['calls']:>9} {values['total']:>9.3f}s "
+                         f"{values['avg'] * 1000:>8.2f}ms {values['p95'] * 1000:>8.2f}ms")
+        if self.counters:
+            lines.append("")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:24} {value:>9}")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"timings": self.summary(), "counters": self.counters}, f, indent=2)
+
+# Prozessweite Instanz, die von allen Modulen verwendet wird
+metrics = Metrics()
+
+def timer(name):
+    return metrics.timer(name)
+
+def count(name, amount=1):
+    metrics.count(name, amount)
+
+def timed(name):
+    """Decorator: misst jeden Aufruf der Funktion unter `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with metrics.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class StageProfiler:
+    """
+    Profiliert die Pipeline abschnittsweise (z.B. ingest/stats/render) mit cProfile und tracemalloc.
+    Jeder Abschnitt bekommt eine eigene .prof-Datei und eigene Allokationsstatistiken,
+    damit z.B. add_chat_line und das Einlesen getrennt betrachtet werden können.
+    """
+    def __init__(self, cpu_prefix=None, mem_top=None):
+        self.cpu_prefix = cpu_prefix
+        self.mem_top = mem_top
+        self.cpu_files = {}
+        self.memory = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        profile = None
+        before = None
+        if self.cpu_prefix:
+            profile = cProfile.Profile()
+            profile.enable()
+        if self.mem_top:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = self._snapshot()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                path = f"{self.cpu_prefix}.{name}.prof"
+                profile.dump_stats(path)
+                self.cpu_files[name] = path
+            if before is not None:
+                _, peak = tracemalloc.get_traced_memory()
+                top = self._snapshot().compare_to(before, 'lineno')[:self.mem_top]
+                self.memory[name] = (peak, top)
+
+    @staticmethod
+    def _snapshot():
+        """Snapshot ohne die Allokationen der Messwerkzeuge selbst"""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def format_report(self):
+        lines = []
+        if self.cpu_files:
+            lines.append("=== CPU-Profil ===")
+            for name, path in self.cpu_files.items():
+                lines.append(f"{name:10} {path}")
+            lines.append("Auswertung z.B. mit: python -m pstats <datei>  (sort cumtime / stats 20)")
+        for name, (peak, top) in self.memory.items():
+            lines.append(f"\n=== Speicher: {name} (Spitze {peak / 1024 / 1024:.1f} MiB) ===")
+            for stat in top:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size_diff / 1024:>+10.1f} KiB {stat.count_diff:>+8} Blöcke  "
+                             f"{frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+from instrumentation import count, timed
+
+def default_cache_path(excel_path):
+    """Standardpfad des Digest-Caches: neben der Excel-Datei, z.B. chat.digests.json"""
+    return Path(excel_path).with_suffix('.digests.json')
+
+def hash_file(path):
+    """SHA-256 einer Datei, gelesen über mmap (hashlib gibt dabei das GIL frei)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return hashlib.sha256(data).hexdigest()
+
+class DigestCache:
+    """
+    Zwischenspeicher für Datei-Digests, gültig solange Pfad, Größe und Änderungszeit gleich sind.
+    Wird als JSON-Datei neben dem Export abgelegt, damit Folgeläufe nichts erneut lesen müssen.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.entries = {}
+        self.changed = False
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warnung: Digest-Cache konnte nicht gelesen werden: {e}")
+
+    @staticmethod
+    def key(path, stat):
+        return f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def get(self, path, stat):
+        return self.entries.get(self.key(path, stat))
+
+    def put(self, path, stat, digest):
+        self.entries[self.key(path, stat)] = digest
+        self.changed = True
+
+    def save(self):
+        """Schreibt den Cache; auf schreibgeschützten Beweismitteln wird nur gewarnt"""
+        if self.path and self.changed:
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f)
+                self.changed = False
+            except OSError as e:
+                print(f"Warnung: Digest-Cache konnte nicht gespeichert werden: {e}")
+
+@timed("hash_paths")
+def hash_paths(paths, cache=None, workers=None, sizes=None):
+    """
+    Berechnet die Digests der Dateien `paths` parallel in einem Thread-Pool.
+    Liefert {pfad (str): digest}; nicht lesbare Dateien fehlen im Ergebnis.
+    Ist `sizes` ein Dictionary, werden dort die Dateigrößen eingetragen (für find_duplicates).
+    """
+    cache = cache or DigestCache()
+    sizes = {} if sizes is None else sizes
+    digests = {}
+    pending = []
+    for path in dict.fromkeys(str(p) for p in paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        sizes[path] = stat.st_size
+        digest = cache.get(path, stat)
+        if digest:
+            digests[path] = digest
+        else:
+            pending.append((path, stat))
+    count("digest_cache_hits", len(digests))
+
+    def work(item):
+        path, stat = item
+        try:
+            return path, stat, hash_file(path)
+        except OSError as e:
+            print(f"Error hashing {path}: {e}")
+            return path, stat, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, stat, digest in pool.map(work, pending):
+            if digest:
+                digests[path] = digest
+                cache.put(path, stat, digest)
+                count("bytes_hashed", stat.st_size)
+    return digests
+
+def hash_attachments(chat, cache_path=None, workers=None, sizes=None):
+    """Digests aller aufgelösten Anhänge eines ChatExport, mit Cache in `cache_path` (`sizes` wie bei hash_paths)"""
+    cache = DigestCache(cache_path)
+    paths = [msg.attachment.full_path for _, msg in chat.iter_attachment_messages() if msg.attachment.full_path]
+    digests = hash_paths(paths, cache, workers, sizes)
+    cache.save()
+    return digests
+
+def canonical_paths(digests):
+    """Ordnet jedem Pfad den ersten Pfad mit identischem Inhalt zu"""
+    first = {}
+    return {path: first.setdefault(digest, path) for path, digest in digests.items()}
+
+@dataclass
+class DuplicateGroup:
+    """Dateien mit identischem Inhalt und die Anzahl der Nachrichten, die darauf verweisen"""
+    digest: str
+    size: int
+    paths: List[str] = field(default_factory=list)
+    references: int = 0
+
+    @property
+    def wasted_bytes(self):
+        return self.size * (len(self.paths) - 1)
+
+def find_duplicates(chat, digests, sizes=None):
+    """
+    Gruppen von Anhängen mit gleichem Inhalt, die in mehreren Dateien gespeichert sind.
+    `sizes` (aus hash_paths) erspart das erneute Abfragen der Dateigrößen.
+    """
+    sizes = sizes or {}
+    groups = {}
+    for _, msg in chat.iter_attachment_messages():
+        path = str(msg.attachment.full_path) if msg.attachment.full_path else None
+        digest = digests.get(path)
+        if digest is None:
+            continue
+        group = groups.get(digest)
+        if group is None:
+            size = sizes[path] if path in sizes else os.path.getsize(path)
+            group = groups[digest] = DuplicateGroup(digest, size)
+        if path not in group.paths:
+            group.paths.append(path)
+        group.references += 1
+    duplicates = [group for group in groups.values() if len(group.paths) > 1]
+    duplicates.sort(key=lambda group: (-group.wasted_bytes, -group.references))
+    return duplicates
+
+def format_duplicate_report(duplicates, limit=20):
+    wasted = sum(group.wasted_bytes for group in duplicates)
+    lines = ["=== Doppelte Medien ===",
+             f"Mehrfach gespeicherte Medien: {len(duplicates)}",
+             f"Doppelt gespeicherte Bytes: {wasted} ({wasted / 1024 / 1024:.1f} MiB)"]
+    for group in duplicates[:limit]:
+        lines.append(f"  {group.digest[:12]}  {len(group.paths)} Dateien, {group.references} Verweise, "
+                     f"{group.size} Bytes: {Path(group.paths[0]).name}")
+    if len(duplicates) > limit:
+        lines.append(f"  ... und {len(duplicates) - limit} weitere Gruppen")
+    return "\n".join(lines)
+
+def main():
+    """
+    Kommandozeile: Anhänge eines Exports hashen und doppelte Medien ausgeben
+    """
+    parser = argparse.ArgumentParser(description='Doppelte Medien in einem Chat-Export finden')
+    parser.add_argument('excel_file', help='Pfad zur Excel-Datei (oder SQLite-Export)')
+    parser.add_argument('--cache', help='Pfad zum Digest-Cache (Standard: <excel_file>.digests.json)')
+    parser.add_argument('--workers', type=int, default=None, help='Anzahl Threads (Standard: automatisch)')
+    parser.add_argument('--limit', type=int, default=20, help='Maximale Anzahl angezeigter Gruppen (Standard: 20)')
+    args = parser.parse_args()
+
+    from functions import resolve_attachments
+    from models import get_reader
+
+    try:
+        chat = get_reader(args.excel_file).read(args.excel_file)
+    except ValueError:
+        print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
+        sys.exit(1)
+    resolve_attachments(chat)
+
+    sizes = {}
+    digests = hash_attachments(chat, args.cache or default_cache_path(args.excel_file), args.workers, sizes)
+    print(f"{len(digests)} Dateien gehasht")
+    print(format_duplicate_report(find_duplicates(chat, digests, sizes), args.limit))
+
+if __name__ == "__main__":
+    main()
@@ -1,141 +1,755 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from enum import IntEnum
+from typing import Iterator, List, Optional
+from collections.abc import Sequence
 from pathlib import Path
+import re
+import sys
 
-@dataclass
+# Dateiendungen für die Typbestimmung von Anhängen
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp'}
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.ogg', '.aac'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv'}
+
+class Direction(IntEnum):
+    """Richtung einer Nachricht (Spalte 'Direction')"""
+    UNKNOWN = 0
+    INCOMING = 1
+    OUTGOING = 2
+
+    @classmethod
+    def parse(cls, value: str) -> "Direction":
+        value = value.strip().lower()
+        if value == 'outgoing':
+            return cls.OUTGOING
+        if value == 'incoming':
+            return cls.INCOMING
+        return cls.UNKNOWN
+
+    @property
+    def label(self) -> str:
+        return "" if self is Direction.UNKNOWN else self.name.capitalize()
+
+class MessageStatus(IntEnum):
+    """Normalisierter Nachrichtenstatus (Spalte 'Status')"""
+    UNKNOWN = 0
+    SENT = 1
+    DELIVERED = 2
+    READ = 3
+    PLAYED = 4
+
+    @classmethod
+    def parse(cls, value: str) -> "MessageStatus":
+        return cls.__members__.get(value.strip().upper(), cls.UNKNOWN)
+
+    @classmethod
+    def split(cls, value: str) -> tuple:
+        """(MessageStatus, Text): der Originaltext bleibt nur für Werte ohne eigenen Status erhalten"""
+        code = cls.parse(value)
+        text = value.strip()
+        return code, (sys.intern(text) if code is cls.UNKNOWN and text else None)
+
+    @property
+    def label(self) -> str:
+        return "" if self is MessageStatus.UNKNOWN else self.name.capitalize()
+
+class AttachmentType(IntEnum):
+    """Art eines Anhangs"""
+    UNKNOWN = 0
+    IMAGE = 1
+    AUDIO = 2
+    VIDEO = 3
+    URL = 4
+
+    @classmethod
+    def from_filename(cls, filename: str) -> "AttachmentType":
+        suffix = Path(filename).suffix.lower()
+        if suffix in IMAGE_EXTENSIONS:
+            return cls.IMAGE
+        if suffix in AUDIO_EXTENSIONS:
+            return cls.AUDIO
+        if suffix in VIDEO_EXTENSIONS:
+            return cls.VIDEO
+        return cls.UNKNOWN
+
+@dataclass(frozen=True, slots=True)
 class Participant:
     """Repräsentiert einen Chat-Teilnehmer"""
     chat_id: str
     name: str
     is_owner: bool = False
 
-@dataclass
+# Platzhalter für Zeilen ohne auswertbaren Absender
+UNKNOWN_PARTICIPANT = Participant(chat_id="", name="")
+
+@dataclass(slots=True)
 class Attachment:
     """Repräsentiert einen Anhang (Bild, Audio, Video)"""
     filename: str
     full_path: Optional[Path] = None
-    type: str = "unknown"  # "image", "audio", "video"
+    type: AttachmentType = AttachmentType.UNKNOWN
     transcription: Optional[str] = None
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Message:
     """Repräsentiert eine einzelne Chat-Nachricht"""
     sender: Participant
     body: str
     timestamp: datetime
-    status: str
+    status_code: MessageStatus
     attachment: Optional[Attachment] = None
+    number: Optional[int] = None
+    direction: Direction = Direction.UNKNOWN
+    deleted: bool = False
+    starred: bool = False
+    status_text: Optional[str] = None  # nur für Statuswerte, die MessageStatus nicht kennt
+
+    @property
+    def status(self) -> str:
+        """Status als Text, z.B. 'Read' (Grundlage von Statistik und Reports)"""
+        return self.status_text or self.status_code.label
+
+@dataclass(frozen=True)
+class MessageFilter:
+    """
+    Auswahl von Nachrichten, die ein Reader schon beim Einlesen anwendet (siehe ChatExportReader.read).
+    Nicht ausgewählte Nachrichten erreichen weder Anhangsauflösung noch Transkription oder Report.
+    `since` ist inklusive, `until` exklusive; Nachrichten ohne Zeitstempel fallen bei einem Zeitraum heraus.
+    `participant` ist eine Chat-ID oder ein Teil des Namens (ohne Beachtung der Groß-/Kleinschreibung).
+    """
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    participant: Optional[str] = None
+    direction: Optional[Direction] = None
+    starred_only: bool = False
+    exclude_deleted: bool = False
+
+    def __bool__(self) -> bool:
+        return any((self.since, self.until, self.participant, self.direction is not None,
+                    self.starred_only, self.exclude_deleted))
+
+    def matches_participant(self, participant: Participant) -> bool:
+        if not self.participant:
+            return True
+        return (participant.chat_id == self.participant
+                or self.participant.lower() in participant.name.lower())
+
+    def matches(self, msg: Message) -> bool:
+        if self.since is not None or self.until is not None:
+            if msg.timestamp is None:
+                return False
+            if self.since is not None and msg.timestamp < self.since:
+                return False
+            if self.until is not None and msg.timestamp >= self.until:
+                return False
+        if self.direction is not None and msg.direction != self.direction:
+            return False
+        if self.starred_only and not msg.starred:
+            return False
+        if self.exclude_deleted and msg.deleted:
+            return False
+        return self.matches_participant(msg.sender)
+
+    def describe(self) -> str:
+        parts = []
+        if self.since is not None:
+            parts.append(f"ab {self.since:%d.%m.%Y %H:%M}")
+        if self.until is not None:
+            parts.append(f"bis vor {self.until:%d.%m.%Y %H:%M}")
+        if self.participant:
+            parts.append(f"Teilnehmer '{self.participant}'")
+        if self.direction is not None:
+            parts.append(self.direction.label)
+        if self.starred_only:
+            parts.append("nur markierte")
+        if self.exclude_deleted:
+            parts.append("ohne gelöschte")
+        return ", ".join(parts)
+
+class ChatAggregates:
+    """
+    Kennzahlen eines ChatExport, die beim Hinzufügen von Nachrichten laufend aktualisiert werden.
+    Statistik und Report lesen sie in O(1), statt alle Nachrichten erneut zu durchlaufen.
+    """
+    __slots__ = ("found", "not_found", "urls", "attachment_types", "participant_counts",
+                 "direction_counts", "status_counts", "deleted", "starred", "first", "last")
+
+    def __init__(self):
+        self.found = 0
+        self.not_found = 0
+        self.urls = 0
+        self.attachment_types = {}
+        self.participant_counts = {}
+        self.direction_counts = {}
+        self.status_counts = {}
+        self.deleted = 0
+        self.starred = 0
+        self.first = None
+        self.last = None
+
+    @classmethod
+    def from_messages(cls, messages) -> "ChatAggregates":
+        aggregates = cls()
+        for msg in messages:
+            aggregates.add(msg)
+        return aggregates
+
+    def add(self, msg: Message):
+        """Berücksichtigt eine weitere Nachricht"""
+        self.participant_counts[msg.sender] = self.participant_counts.get(msg.sender, 0) + 1
+        self.direction_counts[msg.direction] = self.direction_counts.get(msg.direction, 0) + 1
+        self.status_counts[msg.status] = self.status_counts.get(msg.status, 0) + 1
+        self.deleted += msg.deleted
+        self.starred += msg.starred
+        if msg.timestamp:
+            if self.first is None or msg.timestamp < self.first:
+                self.first = msg.timestamp
+            if self.last is None or msg.timestamp > self.last:
+                self.last = msg.timestamp
+
+        attachment = msg.attachment
+        if attachment:
+            self.attachment_types[attachment.type] = self.attachment_types.get(attachment.type, 0) + 1
+            if attachment.full_path:
+                self.found += 1
+            elif attachment.type == AttachmentType.URL:
+                self.urls += 1
+            else:
+                self.not_found += 1
+
+class _StringColumn:
+    """Speichert viele Strings als UTF-8-Puffer mit Offsets (Offsets + Bytes)"""
+    __slots__ = ("_offsets", "_buffer")
+
+    def __init__(self, values):
+        import numpy as np
+
+        encoded = [value.encode('utf-8') for value in values]
+        self._offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=self._offsets[1:])
+        self._buffer = b"".join(encoded)
+
+    def __getitem__(self, index: int) -> str:
+        return self._buffer[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+    @property
+    def nbytes(self) -> int:
+        return self._offsets.nbytes + len(self._buffer)
+
+class ColumnarMessages(Sequence):
+    """
+    Spaltenweise Speicherung der Nachrichten eines ChatExport in NumPy-Arrays.
+    Message-Objekte werden erst beim Zugriff als leichtgewichtige Sicht erzeugt,
+    Statistiken werden als vektorisierte Reduktionen über die Spalten berechnet.
+    Änderungen an den erzeugten Message/Attachment-Objekten werden nicht zurückgeschrieben,
+    Anhänge müssen daher vor der Umwandlung aufgelöst sein.
+    """
+    NO_ATTACHMENT = -1
+
+    def __init__(self, messages: Sequence[Message], participants: List[Participant]):
+        import numpy as np
+
+        self.participants = list(participants)
+        participant_ids = {participant: i for i, participant in enumerate(self.participants)}
+        self.statuses = []
+        status_ids = {}
+        transcriptions = {}
+
+        count = len(messages)
+        self.timestamps = np.empty(count, dtype='datetime64[s]')
+        self.participant_ids = np.empty(count, dtype=np.int32)
+        self.status_codes = np.empty(count, dtype=np.uint16)
+        self.directions = np.empty(count, dtype=np.int8)
+        self.attachment_types = np.empty(count, dtype=np.int8)
+        self.numbers = np.empty(count, dtype=np.int64)
+        self.deleted = np.empty(count, dtype=bool)
+        self.starred = np.empty(count, dtype=bool)
+        bodies, filenames, paths = [], [], []
+
+        for i, msg in enumerate(messages):
+            if msg.sender not in participant_ids:
+                participant_ids[msg.sender] = len(self.participants)
+                self.participants.append(msg.sender)
+            if msg.status not in status_ids:
+                status_ids[msg.status] = len(self.statuses)
+                self.statuses.append(msg.status)
+            self.timestamps[i] = msg.timestamp if msg.timestamp else np.datetime64('NaT')
+            self.participant_ids[i] = participant_ids[msg.sender]
+            self.status_codes[i] = status_ids[msg.status]
+            self.directions[i] = msg.direction
+            self.numbers[i] = msg.number if msg.number is not None else -1
+            self.deleted[i] = msg.deleted
+            self.starred[i] = msg.starred
+            bodies.append(msg.body)
+            attachment = msg.attachment
+            if attachment is None:
+                self.attachment_types[i] = self.NO_ATTACHMENT
+                filenames.append("")
+                paths.append("")
+            else:
+                self.attachment_types[i] = attachment.type
+                filenames.append(attachment.filename)
+                paths.append(str(attachment.full_path) if attachment.full_path else "")
+                if attachment.transcription:
+                    transcriptions[i] = attachment.transcription
+
+        self.bodies = _StringColumn(bodies)
+        self.attachment_filenames = _StringColumn(filenames)
+        self.attachment_paths = _StringColumn(paths)
+        self.attachment_found = np.array([bool(path) for path in paths], dtype=bool)
+        # Transkriptionen sind selten und werden daher nur für betroffene Zeilen gespeichert
+        self.transcriptions = transcriptions
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+
+        attachment = None
+        attachment_type = int(self.attachment_types[index])
+        if attachment_type != self.NO_ATTACHMENT:
+            path = self.attachment_paths[index]
+            attachment = Attachment(
+                filename=self.attachment_filenames[index],
+                full_path=Path(path) if path else None,
+                type=AttachmentType(attachment_type),
+                transcription=self.transcriptions.get(index)
+            )
+        number = int(self.numbers[index])
+        status_code, status_text = MessageStatus.split(self.statuses[self.status_codes[index]])
+        return Message(
+            sender=self.participants[self.participant_ids[index]],
+            body=self.bodies[index],
+            timestamp=self.timestamps[index].item(),
+            status_code=status_code,
+            attachment=attachment,
+            number=number if number >= 0 else None,
+            direction=Direction(int(self.directions[index])),
+            deleted=bool(self.deleted[index]),
+            starred=bool(self.starred[index]),
+            status_text=status_text
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Speicherbedarf der Spalten in Bytes"""
+        arrays = (self.timestamps, self.participant_ids, self.status_codes, self.directions,
+                  self.attachment_types, self.numbers, self.deleted, self.starred, self.attachment_found)
+        return (sum(array.nbytes for array in arrays) + self.bodies.nbytes
+                + self.attachment_filenames.nbytes + self.attachment_paths.nbytes)
+
+    def aggregates(self) -> ChatAggregates:
+        """Berechnet die Kennzahlen als vektorisierte Reduktionen über die Spalten"""
+        import numpy as np
+
+        aggregates = ChatAggregates()
+        has_attachment = self.attachment_types != self.NO_ATTACHMENT
+        aggregates.urls = int(np.count_nonzero(self.attachment_types == AttachmentType.URL))
+        aggregates.found = int(np.count_nonzero(self.attachment_found))
+        aggregates.not_found = int(np.count_nonzero(has_attachment)) - aggregates.found - aggregates.urls
+        type_counts = np.bincount(self.attachment_types[has_attachment], minlength=len(AttachmentType))
+        aggregates.attachment_types = {AttachmentType(code): int(count) for code, count in enumerate(type_counts) if count}
+
+        participant_counts = np.bincount(self.participant_ids, minlength=len(self.participants))
+        aggregates.participant_counts = {self.participants[i]: int(count) for i, count in enumerate(participant_counts) if count}
+        direction_counts = np.bincount(self.directions, minlength=len(Direction))
+        aggregates.direction_counts = {Direction(code): int(count) for code, count in enumerate(direction_counts) if count}
+        status_counts = np.bincount(self.status_codes, minlength=len(self.statuses))
+        aggregates.status_counts = {self.statuses[code]: int(count) for code, count in enumerate(status_counts) if count}
+        aggregates.deleted = int(np.count_nonzero(self.deleted))
+        aggregates.starred = int(np.count_nonzero(self.starred))
+
+        valid = self.timestamps[~np.isnat(self.timestamps)]
+        if len(valid):
+            aggregates.first = valid.min().item()
+            aggregates.last = valid.max().item()
+        return aggregates
+
+    def attachment_indices(self):
+        import numpy as np
+        return np.flatnonzero(self.attachment_types != self.NO_ATTACHMENT)
 
 @dataclass
 class ChatExport:
     """Hauptklasse für den Chat-Export"""
     participants: List[Participant]
-    messages: List[Message]
+    messages: Sequence[Message]
     excel_path: Path
-    
+    metadata: dict = field(default_factory=dict)
+    _aggregates: Optional[ChatAggregates] = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_batches(cls, batches, excel_path: Path) -> "ChatExport":
+        """Sammelt die Blöcke eines Streaming-Readers zu einem ChatExport"""
+        chat = cls(participants=[], messages=[], excel_path=Path(excel_path))
+        for batch in batches:
+            if batch.metadata is not None:
+                chat.metadata.update(batch.metadata)
+            chat.participants.extend(batch.new_participants)
+            for msg in batch.messages:
+                chat.add_message(msg)
+        chat.metadata.setdefault("actual_rows", chat.message_count)
+        return chat
+
+    @property
+    def is_columnar(self) -> bool:
+        return isinstance(self.messages, ColumnarMessages)
+
+    def to_columnar(self) -> "ChatExport":
+        """
+        Stellt die Nachrichten auf spaltenweise Speicherung (ColumnarMessages) um.
+        Anhänge sollten vorher mit resolve_attachments aufgelöst werden.
+        """
+        if not self.is_columnar:
+            self.messages = ColumnarMessages(self.messages, self.participants)
+            self.invalidate_aggregates()
+        return self
+
+    def add_message(self, msg: Message):
+        """Hängt eine Nachricht an und aktualisiert die Kennzahlen inkrementell"""
+        if self.is_columnar:
+            raise TypeError("Spaltenweise gespeicherte Nachrichten können nicht erweitert werden")
+        self.messages.append(msg)
+        if self._aggregates is not None:
+            self._aggregates.add(msg)
+
+    def invalidate_aggregates(self):
+        """
+        Verwirft die Kennzahlen, z.B. nachdem Anhänge aufgelöst oder Nachrichten ersetzt wurden.
+        Sie werden beim nächsten Zugriff neu berechnet.
+        """
+        self._aggregates = None
+
+    @property
+    def aggregates(self) -> ChatAggregates:
+        if self._aggregates is None:
+            if self.is_columnar:
+                self._aggregates = self.messages.aggregates()
+            else:
+                self._aggregates = ChatAggregates.from_messages(self.messages)
+        return self._aggregates
+
     @property
     def message_count(self) -> int:
         return len(self.messages)
-    
+
     @property
     def attachment_stats(self) -> dict:
-        """Berechnet Statistiken über Anhänge"""
-        found = 0
-        not_found = 0
-        for msg in self.messages:
-            if msg.attachment:
-                if msg.attachment.full_path:
-                    found += 1
-                else:
-                    not_found += 1
+        """Statistiken über Anhänge"""
+        aggregates = self.aggregates
         return {
-            "found": found,
-            "not_found": not_found
+            "found": aggregates.found,
+            "not_found": aggregates.not_found,
+            "urls": aggregates.urls
         }
 
+    def iter_attachment_messages(self):
+        """Liefert (Index, Nachricht) für alle Nachrichten mit Anhang"""
+        if self.is_columnar:
+            for index in self.messages.attachment_indices():
+                yield int(index), self.messages[index]
+            return
+        for index, msg in enumerate(self.messages):
+            if msg.attachment is not None:
+                yield index, msg
+
+    @property
+    def deleted_count(self) -> int:
+        return self.aggregates.deleted
+
+    @property
+    def starred_count(self) -> int:
+        return self.aggregates.starred
+
+    @property
+    def attachment_type_counts(self) -> dict:
+        """Anzahl Anhänge je AttachmentType"""
+        return self.aggregates.attachment_types
+
+    @property
+    def direction_counts(self) -> dict:
+        """Anzahl Nachrichten je Richtung"""
+        return self.aggregates.direction_counts
+
+    @property
+    def status_counts(self) -> dict:
+        """Anzahl Nachrichten je Status-Text"""
+        return self.aggregates.status_counts
+
+    @property
+    def participant_counts(self) -> dict:
+        """Anzahl Nachrichten je Teilnehmer"""
+        return self.aggregates.participant_counts
+
+    @property
+    def date_range(self) -> tuple:
+        """Erster und letzter Zeitstempel, (None, None) ohne gültige Zeitstempel"""
+        return self.aggregates.first, self.aggregates.last
+
+def parse_participant(from_field: str) -> tuple[Optional[str], Optional[str]]:
+    """
+    Extrahiert Chat-ID und Namen aus dem From-Feld.
+    Unterstützt "ID Name" (PA-Format), "Name (ID)" und sonst das gesamte Feld als Namen.
+    """
+    from_field = from_field.strip()
+    if not from_field or from_field == 'nan':
+        return None, None
+
+    parts = from_field.split(maxsplit=1)
+    if len(parts) == 2 and (parts[0].isdigit() or '@' in parts[0]):
+        return parts[0], parts[1]
+
+    match = re.search(r'(.+?)\s*\(([^)]+)\)', from_field)
+    if match:
+        return match.group(2).strip(), match.group(1).strip()
+
+    return from_field, from_field
+
+def _cell_str(value) -> str:
+    """Wandelt einen Zellwert in einen String um, leere Zellen (NaN/None) werden zu ''"""
+    if value is None or value != value:  # NaN ist ungleich sich selbst
+        return ""
+    value = str(value).strip()
+    return "" if value == 'nan' else value
+
+def _cell_int(value: str) -> Optional[int]:
+    """Liest eine Ganzzahl (z.B. Spalte '#'), None wenn die Zelle keine Zahl enthält"""
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+# Spalten, aus denen eine Nachricht aufgebaut wird (Reihenfolge entspricht _MessageBuilder.build)
+MESSAGE_COLUMNS = ["#", "From", "Direction", "Body", "Status", "Attachment #1", "Deleted", "Starred message",
+                   "Transcript"]
+# Zeitstempel-Spalten, werden gesammelt von TimestampNormalizer verarbeitet
+TIMESTAMP_COLUMNS = ["Timestamp-Date", "Timestamp-Time"]
+
+SYSTEM_SENDER = 'System Message System Message'
+
+# Standardgröße der Blöcke beim Streaming
+DEFAULT_BATCH_SIZE = 5000
+
+@dataclass(slots=True)
+class MessageBatch:
+    """Ein Block von Nachrichten aus ChatExportReader.iter_batches"""
+    messages: List[Message]
+    new_participants: List[Participant]  # Teilnehmer, die in diesem Block zum ersten Mal auftauchen
+    metadata: Optional[dict] = None  # Kopfdaten im ersten Block, Ergebnisse (z.B. timestamp_failures) im letzten
+
+class _MessageBuilder:
+    """
+    Baut Message-Objekte aus bereits in Strings umgewandelten Zellwerten (siehe MESSAGE_COLUMNS)
+    und dem normalisierten Zeitstempel und sammelt dabei die Teilnehmer. Sind die Besitzer vorab nicht bekannt (Streaming),
+    gilt ein Teilnehmer als Besitzer, wenn seine erste Nachricht ausgehend ist.
+    """
+    def __init__(self, owners: Optional[set] = None):
+        self.owners = owners
+        self.participants = {}
+        self.new_participants = []
+
+    def participant(self, sender: str, direction: Direction) -> Participant:
+        chat_id, name = parse_participant(sender)
+        if not chat_id:
+            return UNKNOWN_PARTICIPANT
+        participant = self.participants.get(chat_id)
+        if participant is None:
+            if self.owners is not None:
+                is_owner = chat_id in self.owners
+            else:
+                is_owner = direction == Direction.OUTGOING
+            participant = Participant(
+                chat_id=sys.intern(chat_id),
+                name=sys.intern(name),
+                is_owner=is_owner and sender != SYSTEM_SENDER
+            )
+            self.participants[chat_id] = participant
+            # Systemnachrichten erscheinen nicht in der Teilnehmerliste
+            if sender != SYSTEM_SENDER:
+                self.new_participants.append(participant)
+        return participant
+
+    def take_new_participants(self) -> List[Participant]:
+        new_participants, self.new_participants = self.new_participants, []
+        return new_participants
+
+    def build(self, timestamp, number, sender, direction, body, status, attachment_name, deleted, starred,
+              transcript="") -> Message:
+        direction = Direction.parse(direction)
+
+        attachment = None
+        if attachment_name:
+            attachment = Attachment(
+                filename=attachment_name,
+                full_path=None,  # Wird später gefüllt
+                type=AttachmentType.from_filename(attachment_name),
+                transcription=transcript or None  # Transkription des Exports (Spalte 'Transcript')
+            )
+
+        status_code, status_text = MessageStatus.split(status)
+        return Message(
+            sender=self.participant(sender, direction),
+            body=body,
+            timestamp=timestamp,
+            status_code=status_code,
+            attachment=attachment,
+            number=_cell_int(number),
+            direction=direction,
+            deleted=deleted == 'Yes',
+            starred=bool(starred),
+            status_text=status_text
+        )
+
 class ChatExportReader:
-    """Basis-Klasse für verschiedene Chat-Export-Reader"""
-    def read(self, file_path: Path) -> ChatExport:
+    """
+    Basis-Klasse für verschiedene Chat-Export-Reader.
+    Mit `message_filter` liefern read() und iter_batches() nur die ausgewählten Nachrichten;
+    die Teilnehmerliste und 'actual_rows' beziehen sich weiterhin auf den gesamten Export.
+    """
+    def read(self, file_path: Path, message_filter: Optional[MessageFilter] = None) -> ChatExport:
         raise NotImplementedError
 
+    def iter_batches(self, file_path: Path, batch_size: int = DEFAULT_BATCH_SIZE,
+                     message_filter: Optional[MessageFilter] = None) -> Iterator[MessageBatch]:
+        """
+        Liefert die Nachrichten in Blöcken fester Größe, Teilnehmer werden dabei fortlaufend gemeldet.
+        Die Standardimplementierung liest den gesamten Export; Reader, die echtes Streaming
+        unterstützen, überschreiben diese Methode.
+        """
+        chat = self.read(file_path, message_filter)
+        metadata = chat.metadata
+        new_participants = list(chat.participants)
+        for start in range(0, len(chat.messages), batch_size):
+            yield MessageBatch(list(chat.messages[start:start + batch_size]), new_participants, metadata)
+            new_participants, metadata = [], None
+
+def get_reader(file_path) -> ChatExportReader:
+    """Wählt den passenden Reader anhand der Dateiendung (Excel oder SQLite-Zwischenformat)"""
+    from sqlite_export import SqliteChatExportReader, is_sqlite_file
+
+    if is_sqlite_file(file_path):
+        return SqliteChatExportReader()
+    return ExcelChatExportReader()
+
 class ExcelChatExportReader(ChatExportReader):
     """Liest Chat-Exports aus Excel-Dateien"""
-    def read(self, file_path: Path) -> ChatExport:
-        import pandas as pd
-        
-        # Excel einlesen
-        df = pd.read_excel(file_path, na_values=[''], keep_default_na=False)
-        
-        # Teilnehmer sammeln
-        participants_dict = {}
-        messages = []
-        
-        def parse_participant(participant_str: str) -> tuple[str, str]:
-            """Parse participant string into chat ID and name."""
-            parts = participant_str.strip().split()
-            if len(parts) >= 2:
-                chat_id = parts[0]
-                name = ' '.join(parts[1:])
-                if chat_id.isdigit():
-                    return chat_id, name
-            return None, participant_str
-
-        # Erste Runde: Teilnehmer identifizieren
-        for _, row in df.iloc[1:].iterrows():
-            sender = str(row.iloc[1]).strip()
-            if sender and sender != 'nan' and sender != 'From' and sender != 'System Message System Message':
-                chat_id, name = parse_participant(sender)
-                if chat_id and name:
-                    if chat_id not in participants_dict:
-                        participants_dict[chat_id] = Participant(
-                            chat_id=chat_id,
-                            name=name,
-                            is_owner=str(row.iloc[6]).strip().lower() == 'outgoing'
-                        )
+    def read(self, file_path: Path, message_filter: Optional[MessageFilter] = None) -> ChatExport:
+        from functions import read_excel_file
+
+        # Excel einlesen, Spalten werden anhand ihrer Bezeichner gefunden und nur die benötigten geparst
+        df, metadata = read_excel_file(file_path, MESSAGE_COLUMNS + TIMESTAMP_COLUMNS)
+        if df is None:
+            raise ValueError(f"Excel-Datei konnte nicht gelesen werden: {metadata.get('error')}")
+
+        rows = [
+            tuple(_cell_str(value) for value in row)
+            for row in df[MESSAGE_COLUMNS].itertuples(index=False, name=None)
+        ]
+        timestamps = self._parse_timestamps(df["Timestamp-Date"], df["Timestamp-Time"], metadata)
+
+        # Erste Runde: Besitzer ist, wer ausgehende Nachrichten hat
+        owners = set()
+        for _, sender, direction, *_ in rows:
+            if Direction.parse(direction) == Direction.OUTGOING:
+                chat_id, _ = parse_participant(sender)
+                if chat_id:
+                    owners.add(chat_id)
 
         # Zweite Runde: Nachrichten sammeln
-        for _, row in df.iloc[1:].iterrows():
-            sender = str(row.iloc[1]).strip()
-            chat_id, _ = parse_participant(sender)
-            
-            if chat_id and chat_id in participants_dict:
-                body = str(row.iloc[8]).strip()  # Body ist in Spalte 8
-                if body == 'nan':
-                    body = ""
-                
-                # Timestamp verarbeiten
-                timestamp = str(row.iloc[18]).strip()  # Timestamp-Time
-                timestamp = timestamp.replace('(UTC+0)', '').strip()
-                if '.' not in timestamp:
-                    date = str(row.iloc[17]).strip()  # Timestamp-Date
-                    if date != 'nan' and date:
-                        timestamp = f"{date} {timestamp}"
-                try:
-                    timestamp_dt = datetime.strptime(timestamp, "%d.%m.%Y %H:%M:%S")
-                except ValueError:
-                    timestamp_dt = datetime.now()  # Fallback
-                
-                # Anhang verarbeiten
-                attachment = None
-                attachment_name = str(row.iloc[25]).strip()  # Attachment #1
-                if attachment_name and attachment_name != 'nan':
-                    attachment = Attachment(
-                        filename=attachment_name,
-                        full_path=None  # Wird später gefüllt
-                    )
-                
-                message = Message(
-                    sender=participants_dict[chat_id],
-                    body=body,
-                    timestamp=timestamp_dt,
-                    status=str(row.iloc[9]).strip(),  # Status ist in Spalte 9
-                    attachment=attachment
-                )
-                messages.append(message)
-        
+        builder = _MessageBuilder(owners)
+        messages = [builder.build(timestamp, *row) for timestamp, row in zip(timestamps, rows)]
+        if message_filter:
+            messages = [msg for msg in messages if message_filter.matches(msg)]
+            metadata["filter"] = message_filter.describe()
+
         return ChatExport(
-            participants=list(participants_dict.values()),
+            participants=builder.take_new_participants(),
             messages=messages,
-            excel_path=Path(file_path)
+            excel_path=Path(file_path),
+            metadata=metadata
         )
+
+    @staticmethod
+    def _parse_timestamps(dates, times, metadata: dict) -> list:
+        """Normalisiert die Zeitstempel-Spalten und trägt die Anzahl nicht lesbarer Werte in die Metadaten ein"""
+        from functions import TimestampNormalizer
+
+        normalizer = TimestampNormalizer()
+        timestamps = normalizer.parse(dates, times)
+        metadata["timestamp_format"] = normalizer.format
+        metadata["timestamp_failures"] = normalizer.failures
+        if normalizer.failures:
+            print(f"Warnung: {normalizer.failures} Zeitstempel konnten nicht gelesen werden")
+        return timestamps
+
+    def iter_batches(self, file_path: Path, batch_size: int = DEFAULT_BATCH_SIZE,
+                     message_filter: Optional[MessageFilter] = None) -> Iterator[MessageBatch]:
+        """
+        Liest die Excel-Datei zeilenweise (openpyxl read-only), der Speicherbedarf
+        hängt damit nur von der Blockgröße ab, nicht von der Länge des Chats.
+        """
+        from openpyxl import load_workbook
+        from functions import parse_messages_count, ColumnResolver, TimestampNormalizer
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            first_row = next(rows, ())
+            header_row = next(rows, ())
+
+            # Spalten werden anhand ihrer Bezeichner in Zeile 2 gefunden
+            resolver = ColumnResolver(header_row)
+            missing_columns = resolver.missing(MESSAGE_COLUMNS + TIMESTAMP_COLUMNS)
+            if missing_columns:
+                print(f"Warnung: Folgende Spalten fehlen in der Excel-Datei: {missing_columns}")
+            get_values = resolver.getter(MESSAGE_COLUMNS)
+            get_timestamp = resolver.getter(TIMESTAMP_COLUMNS)
+
+            metadata = {
+                "messages_count": parse_messages_count(first_row[1] if len(first_row) > 1 else None),
+                "file_name": Path(file_path).name,
+                "import_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+
+            if message_filter:
+                metadata["filter"] = message_filter.describe()
+
+            builder = _MessageBuilder()
+            normalizer = TimestampNormalizer()
+            batch = []
+            total_rows = 0
+
+            def make_batch():
+                # Zeitstempel werden blockweise vektorisiert geparst, das Format nur im ersten Block erkannt
+                dates, times = zip(*(get_timestamp(row) for row in batch)) if batch else ((), ())
+                timestamps = normalizer.parse(dates, times)
+                messages = [
+                    builder.build(timestamp, *(_cell_str(value) for value in get_values(row)))
+                    for timestamp, row in zip(timestamps, batch)
+                ]
+                if message_filter:
+                    messages = [msg for msg in messages if message_filter.matches(msg)]
+                return MessageBatch(messages, builder.take_new_participants(), metadata)
+
+            for row in rows:
+                if not any(value is not None for value in row):
+                    continue
+                batch.append(row)
+                total_rows += 1
+                if len(batch) >= batch_size:
+                    yield make_batch()
+                    batch, metadata = [], None
+            # Der letzte Block meldet zusätzlich das Ergebnis der Zeitstempel-Normalisierung
+            final = make_batch() if batch else MessageBatch([], builder.take_new_participants(), metadata)
+            final.metadata = dict(final.metadata or {}, timestamp_format=normalizer.format,
+                                  timestamp_failures=normalizer.failures, actual_rows=total_rows)
+            yield final
+        finally:
+            workbook.close()
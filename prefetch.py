@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import count, timer
+
+_END = object()
+
+class Prefetcher:
+    """
+    Lädt die Elemente einer Schlüsselfolge in Hintergrund-Threads voraus.
+
+    Es sind höchstens `window` Ladevorgänge vor dem Leser unterwegs. get() muss mit den
+    Schlüsseln in derselben Reihenfolge aufgerufen werden, in der `keys` sie liefert; übersprungene
+    Schlüssel werden verworfen. Blockiert wird nur, wenn das angeforderte Element noch lädt.
+    Für Schlüssel, die nicht im Fenster liegen, liefert get() None (der Aufrufer lädt dann selbst).
+    """
+    def __init__(self, keys, load, window=8, workers=4):
+        self._keys = iter(keys)
+        self._load = load
+        self.window = max(1, window)
+        self._pending = deque()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='prefetch')
+        self._fill()
+
+    def _fill(self):
+        while len(self._pending) < self.window:
+            key = next(self._keys, _END)
+            if key is _END:
+                return
+            self._pending.append((key, self._pool.submit(self._load, key)))
+
+    def get(self, key):
+        if not any(pending_key == key for pending_key, _ in self._pending):
+            count("prefetch_miss")
+            return None
+        while True:
+            pending_key, future = self._pending.popleft()
+            self._fill()
+            if pending_key == key:
+                if not future.done():
+                    count("prefetch_wait")
+                with timer("prefetch_wait"):
+                    return future.result()
+
+    def close(self):
+        self._pending.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
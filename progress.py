@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+import time
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+class ProgressReporter:
+    """
+    Fortschrittsanzeige für lange Läufe: Nachrichten/s, geschriebene Seiten, verarbeitete Bilder,
+    geschriebene Bytes und geschätzte Restzeit.
+
+    update() wird je Nachricht aufgerufen, ausgegeben wird aber höchstens alle `interval` Sekunden.
+    Weitere Kennzahlen liefert `stats` (z.B. ReportBackend.progress_stats) nur zum Zeitpunkt der Ausgabe.
+    Im Modus 'json' wird je Ausgabe eine JSON-Zeile geschrieben (für Job-Scheduler), sonst eine
+    sich überschreibende Statuszeile. Die Ausgabe erfolgt auf stderr, damit stdout unverändert bleibt.
+    Bei einem fortgesetzten Lauf ist `start` die Anzahl bereits erledigter Nachrichten; Rate und
+    Restzeit beruhen nur auf den Nachrichten dieses Laufs.
+    """
+    def __init__(self, total, mode='text', interval=1.0, stats=None, stream=None, start=0):
+        self.total = total
+        self.mode = mode
+        self.interval = interval
+        self.stats = stats
+        self.stream = stream or sys.stderr
+        self.initial = start
+        self.done = start
+        self.start = time.monotonic()
+        self.next_output = self.start + interval
+
+    def update(self, done):
+        self.done = done
+        now = time.monotonic()
+        if now >= self.next_output:
+            self.next_output = now + self.interval
+            self.emit(now)
+
+    def snapshot(self, now=None):
+        """Aktueller Stand als Dictionary (Grundlage beider Ausgabeformate)"""
+        elapsed = (now or time.monotonic()) - self.start
+        rate = (self.done - self.initial) / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.done, 0)
+        values = {
+            "done": self.done,
+            "total": self.total,
+            "percent": round(self.done / self.total * 100, 1) if self.total else 100.0,
+            "messages_per_sec": round(rate, 1),
+            "elapsed": round(elapsed, 1),
+            "eta": round(remaining / rate, 1) if rate > 0 else None,
+            "pages": None,
+            "images": None,
+            "bytes_out": None,
+        }
+        if self.stats is not None:
+            values.update(self.stats())
+        return values
+
+    def emit(self, now=None, event="progress"):
+        values = self.snapshot(now)
+        if self.mode == 'json':
+            self.stream.write(json.dumps(dict(values, event=event)) + "\n")
+            self.stream.flush()
+            return
+
+        parts = [f"{values['done']}/{values['total']} Nachrichten ({values['percent']:.1f}%)",
+                 f"{values['messages_per_sec']:.0f} Nachr./s"]
+        if values["pages"] is not None:
+            parts.append(f"Seite {values['pages']}")
+        if values["images"] is not None:
+            parts.append(f"{values['images']} Bilder")
+        if values["bytes_out"] is not None:
+            parts.append(format_bytes(values["bytes_out"]))
+        if event == "done":
+            parts.append(f"Dauer {format_duration(values['elapsed'])}")
+        elif values["eta"] is not None:
+            parts.append(f"Rest {format_duration(values['eta'])}")
+        self.stream.write("\r" + " | ".join(parts) + ("\n" if event == "done" else ""))
+        self.stream.flush()
+
+    def finish(self):
+        """Abschlussmeldung, unabhängig vom Ausgabeintervall"""
+        self.emit(event="done")
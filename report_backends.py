@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import html
+import json
+import os
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from models import AttachmentType, Direction
+from transcription import attachment_transcription
+
+# Kantenlänge der Vorschaubilder im HTML-Report
+THUMBNAIL_SIZE = 320
+
+# URL-Anhänge werden nur mit diesen Schemata verlinkt, alles andere (z.B. javascript:) bleibt Text
+LINK_SCHEMES = ("http", "https", "mailto", "ftp")
+
+class ReportBackend:
+    """
+    Schnittstelle für Report-Ausgabeformate, die von generate_chat_report angesteuert wird:
+    begin() einmal mit dem ChatExport, add_message() je Nachricht in Reihenfolge, finish() am Ende.
+    add_message() liefert die PDF-Seite der Nachricht oder None, wenn das Format keine Seiten kennt.
+    Formate, die abgebrochene Läufe fortsetzen können, überschreiben checkpoint() und resume().
+    """
+    name = ""
+    extension = ""
+
+    def __init__(self, output_file, verbose=False):
+        self.output_file = Path(output_file)
+        self.verbose = verbose
+
+    def begin(self, chat):
+        pass
+
+    def add_message(self, index, message):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+    def output_files(self):
+        """Nach finish(): die tatsächlich geschriebenen Report-Dateien"""
+        return [self.output_file]
+
+    def checkpoint(self, next_index, pages):
+        """
+        Wird nach jeder Nachricht aufgerufen; sichert bei Bedarf den Stand, ab dem ein abgebrochener
+        Lauf mit resume() fortgesetzt werden kann (`pages`: Seiten je Nachricht für den Suchindex).
+        """
+
+    def resume(self, chat):
+        """Statt begin(): setzt am letzten Checkpoint fort, liefert (nächster Index, pages) oder None"""
+        return None
+
+    def progress_stats(self):
+        """Kennzahlen für die Fortschrittsanzeige (pages, images, bytes_out), fehlende Werte bleiben weg"""
+        return {}
+
+    def bytes_written(self):
+        """Größe der Ausgabedatei, auch während noch geschrieben wird"""
+        if self.file.closed:
+            return os.path.getsize(self.output_file)
+        return self.file.tell()
+
+class JsonlReportBackend(ReportBackend):
+    """Schreibt je Nachricht eine JSON-Zeile, Anhänge werden nur über ihren Pfad referenziert"""
+    name = "jsonl"
+    extension = ".jsonl"
+
+    def begin(self, chat):
+        self.file = open(self.output_file, 'w', encoding='utf-8')
+
+    def add_message(self, index, message):
+        attachment = None
+        if message.attachment is not None:
+            attachment = {
+                "filename": message.attachment.filename,
+                "path": str(message.attachment.full_path) if message.attachment.full_path else None,
+                "type": message.attachment.type.name.lower(),
+                "transcription": attachment_transcription(message.attachment) or None,
+            }
+        record = {
+            "index": index,
+            "number": message.number,
+            "sender": message.sender.name,
+            "sender_id": message.sender.chat_id,
+            "direction": message.direction.label,
+            "timestamp": message.timestamp.isoformat() if message.timestamp else None,
+            "status": message.status,
+            "body": message.body,
+            "deleted": message.deleted,
+            "starred": message.starred,
+            "attachment": attachment,
+        }
+        self.file.write(json.dumps(record, ensure_ascii=False))
+        self.file.write("\n")
+        return None
+
+    def finish(self):
+        self.file.close()
+
+    def progress_stats(self):
+        return {"bytes_out": self.bytes_written()}
+
+class HtmlReportBackend(ReportBackend):
+    """
+    Schreibt den Report Nachricht für Nachricht als eine HTML-Datei.
+    Bilder werden relativ zur Ausgabedatei verlinkt oder mit `thumbnails=True` als
+    verkleinerte Kopien in <output>_files/ abgelegt, aber nie in die Datei eingebettet.
+    """
+    name = "html"
+    extension = ".html"
+
+    STYLE = """
+        body { font-family: 'DejaVu Sans', sans-serif; font-size: 14px; max-width: 60em; margin: 2em auto; }
+        .participants { border-bottom: 1px solid #999; padding-bottom: 1em; margin-bottom: 1em; }
+        .message { margin: 0.4em 0; padding: 0.4em 0.6em; border-radius: 6px; background: #f2f2f2; }
+        .message.outgoing { background: #dcf8c6; margin-left: 20%; }
+        .message.incoming { margin-right: 20%; }
+        .meta { font-size: 11px; color: #666; }
+        .body { white-space: pre-wrap; }
+        .missing, .transcription { font-style: italic; color: #666; }
+        img { max-width: 100%; max-height: 320px; }
+    """
+
+    def __init__(self, output_file, verbose=False, thumbnails=False):
+        super().__init__(output_file, verbose)
+        self.thumbnails = thumbnails
+        self.images = 0
+        self.thumbnail_dir = self.output_file.with_name(self.output_file.stem + '_files')
+
+    def begin(self, chat):
+        title = html.escape(Path(chat.excel_path).stem)
+        self.file = open(self.output_file, 'w', encoding='utf-8')
+        self.file.write(f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{title}</title>\n'
+                        f'<style>{self.STYLE}</style>\n</head>\n<body>\n<h1>{title}</h1>\n'
+                        '<div class="participants">\n<h2>Chat Participants</h2>\n<ul>\n')
+        for participant in chat.participants:
+            owner = " (OWNER)" if participant.is_owner else ""
+            self.file.write(f'<li>{html.escape(participant.name)}{owner}</li>\n')
+        self.file.write('</ul>\n</div>\n')
+        if self.thumbnails:
+            self.thumbnail_dir.mkdir(exist_ok=True)
+
+    def add_message(self, index, message):
+        direction = "outgoing" if message.direction == Direction.OUTGOING else "incoming"
+        timestamp = message.timestamp.strftime('%d.%m.%Y %H:%M:%S') if message.timestamp else ''
+        meta = [html.escape(message.sender.name), timestamp, html.escape(message.status)]
+        if message.starred:
+            meta.append("★")
+        if message.deleted:
+            meta.append("deleted")
+
+        parts = [f'<div class="message {direction}" id="m{index}">',
+                 f'<div class="meta">{" · ".join(part for part in meta if part)}</div>']
+        if message.body:
+            parts.append(f'<div class="body">{html.escape(message.body)}</div>')
+        if message.attachment is not None:
+            parts.append(self.attachment_html(message.attachment))
+        elif not message.body:
+            parts.append('<div class="missing">[Empty message]</div>')
+        parts.append('</div>\n')
+        self.file.write("\n".join(parts))
+        return None
+
+    def attachment_html(self, attachment):
+        """HTML für einen Anhang: Link, Bild, Audio-/Video-Player oder Platzhalter"""
+        filename = html.escape(attachment.filename)
+        if attachment.type == AttachmentType.URL:
+            if urlsplit(attachment.filename).scheme.lower() not in LINK_SCHEMES:
+                return f'<div class="attachment">{filename}</div>'
+            return f'<div class="attachment"><a href="{html.escape(attachment.filename, quote=True)}">{filename}</a></div>'
+        if not attachment.full_path:
+            return f'<div class="missing">[Missing Attachment: {filename}]</div>'
+
+        src = html.escape(self.relative_path(attachment.full_path), quote=True)
+        if attachment.type == AttachmentType.IMAGE:
+            self.images += 1
+            thumbnail = self.thumbnail(attachment.full_path) if self.thumbnails else None
+            img_src = html.escape(self.relative_path(thumbnail), quote=True) if thumbnail else src
+            content = f'<a href="{src}"><img src="{img_src}" alt="{filename}" loading="lazy"></a>'
+        elif attachment.type == AttachmentType.AUDIO:
+            content = f'<audio controls preload="none" src="{src}"></audio>'
+        elif attachment.type == AttachmentType.VIDEO:
+            content = f'<video controls preload="none" src="{src}"></video>'
+        else:
+            content = f'<a href="{src}">{filename}</a>'
+
+        transcription = attachment_transcription(attachment)
+        if transcription:
+            content += f'\n<div class="transcription">{html.escape(transcription)}</div>'
+        return f'<div class="attachment">{content}</div>'
+
+    def relative_path(self, path):
+        """Pfad (URL-kodiert) relativ zur Ausgabedatei, damit der Report zusammen mit dem Export verschoben werden kann"""
+        try:
+            return quote(Path(os.path.relpath(Path(path).resolve(), self.output_file.resolve().parent)).as_posix())
+        except ValueError:
+            # z.B. unterschiedliche Laufwerke unter Windows
+            return Path(path).resolve().as_uri()
+
+    def thumbnail(self, image_path):
+        """Erzeugt (einmalig) ein verkleinertes JPEG des Bildes und liefert dessen Pfad, bei Fehlern None"""
+        image_path = Path(image_path)
+        digest = hashlib.md5(str(image_path.resolve()).encode("utf-8")).hexdigest()[:8]
+        thumb_path = self.thumbnail_dir / f"{image_path.stem}_{digest}.jpg"
+        if thumb_path.exists():
+            return thumb_path
+        try:
+            from PIL import Image
+            with Image.open(image_path) as img:
+                img.draft('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+                img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+                img.convert('RGB').save(thumb_path, 'JPEG', quality=80)
+            return thumb_path
+        except Exception as e:
+            print(f"Error creating thumbnail for {image_path}: {e}")
+            return None
+
+    def finish(self):
+        self.file.write('</body>\n</html>\n')
+        self.file.close()
+
+    def progress_stats(self):
+        return {"images": self.images, "bytes_out": self.bytes_written()}
+
+# Formate ohne reportlab; 'pdf' wird in generate_report über ChatReport bedient
+BACKENDS = {backend.name: backend for backend in (HtmlReportBackend, JsonlReportBackend)}
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+DEFAULT_PORT = 8765
+
+# Erlaubte Felder eines Auftrags und ihre JSON-Typen (null ist immer erlaubt)
+JOB_FIELDS = {
+    "type": (str,), "excel_file": (str,), "format": (str,), "output": (str,), "search_index": (str,),
+    "pages_per_volume": (int,), "image_dpi": (int,), "prefetch": (int,),
+    "thumbnails": (bool,), "resume": (bool,), "refresh": (bool,), "verbose": (bool,), "wait": (bool,),
+    "filter": (dict,), "transcribe": (bool, dict),
+}
+FILTER_FIELDS = {
+    "since": (str,), "until": (str,), "participant": (str,), "direction": (str,),
+    "starred_only": (bool,), "exclude_deleted": (bool,),
+}
+TRANSCRIBE_FIELDS = {"model": (str,), "quantize": (str,), "threads": (int,)}
+POSITIVE_FIELDS = ("pages_per_volume", "image_dpi", "prefetch", "threads")
+
+def check_fields(options, fields, what):
+    """ValueError, wenn `options` kein JSON-Objekt ist, unbekannte Felder oder Werte falschen Typs enthält"""
+    if not isinstance(options, dict):
+        raise ValueError(f"{what} müssen ein JSON-Objekt sein")
+    unknown = sorted(str(key) for key in options if key not in fields)
+    if unknown:
+        raise ValueError(f"Unbekannte {what}: {', '.join(unknown)}")
+    for key, value in options.items():
+        if value is None:
+            continue
+        # type() statt isinstance(), damit true/false nicht als Zahl durchgehen
+        if type(value) not in fields[key]:
+            raise ValueError(f"Ungültiger Wert für {key}: {json.dumps(value)}")
+        if key in POSITIVE_FIELDS and value < 1:
+            raise ValueError(f"{key} muss mindestens 1 sein")
+
+class LRUCache:
+    """Threadsicherer LRU-Cache mit fester Anzahl Einträge und Trefferstatistik"""
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, create):
+        """
+        Liefert den Eintrag zu `key` oder legt ihn mit create() an. create() läuft ohne Sperre,
+        damit andere Aufträge währenddessen weiterarbeiten können; gleichzeitige Anfragen nach
+        demselben Schlüssel erzeugen den Eintrag dann ggf. zweimal, behalten wird der erste.
+        """
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+        value = create()
+        with self._lock:
+            value = self.entries.setdefault(key, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def discard(self, predicate):
+        """Entfernt alle Einträge, deren Schlüssel `predicate` erfüllt"""
+        with self._lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                del self.entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+class Job:
+    """Ein Statistik- oder Render-Auftrag und sein Ergebnis"""
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.params.get("type"),
+            "excel_file": self.params.get("excel_file"),
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "queued": round((self.started or time.time()) - self.created, 3),
+            "duration": round(self.finished - self.started, 3) if self.finished and self.started else None,
+        }
+
+class ReportServer:
+    """
+    Hält alles warm, was sonst jeder Aufruf von generate_report.py neu aufbaut: importierte
+    Module (pandas, openpyxl, reportlab), registrierte Schriften, die Anhangsindizes der
+    Exporte und die eingelesenen ChatExports (je Datei, Änderungszeit und Filter, beide als LRU).
+    Aufträge laufen in einem Thread-Pool mit `workers` Threads.
+    Ausgaben (Report, Suchindex) dürfen nur in `output_dirs` liegen, ohne Angabe nur im
+    Verzeichnis des jeweiligen Exports. Von den abgeschlossenen Aufträgen werden nur die letzten
+    `keep_jobs` aufbewahrt.
+    """
+    JOB_TYPES = ("stats", "render")
+
+    def __init__(self, workers=2, cache_size=8, scan_workers=8, output_dirs=None, keep_jobs=500):
+        self.workers = workers
+        self.keep_jobs = keep_jobs
+        self.output_dirs = [Path(path).resolve() for path in output_dirs or []]
+        self.scan_workers = scan_workers
+        self.indexes = LRUCache(cache_size)
+        self.chats = LRUCache(cache_size)
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self.started = time.time()
+
+    def warm_up(self):
+        """Lädt die Module und Schriften, die sonst beim ersten Auftrag geladen würden"""
+        import functions  # noqa: F401  (pandas)
+        import openpyxl  # noqa: F401
+        from generate_report import register_fonts
+        register_fonts()
+
+    def submit(self, params):
+        """Prüft die Parameter eines Auftrags und reiht ihn ein; ValueError bei ungültigen Angaben"""
+        from generate_report import REPORT_BACKENDS
+
+        check_fields(params, JOB_FIELDS, "Auftragsfelder")
+        if params.get("type") not in self.JOB_TYPES:
+            raise ValueError(f"Unbekannter Auftragstyp: {params.get('type')} (erlaubt: {', '.join(self.JOB_TYPES)})")
+        if not params.get("excel_file"):
+            raise ValueError("excel_file fehlt")
+        if not os.path.exists(params["excel_file"]):
+            raise ValueError(f"Die Datei '{params['excel_file']}' existiert nicht.")
+        if params.get("format", "pdf") not in REPORT_BACKENDS:
+            raise ValueError(f"Unbekanntes Ausgabeformat: {params['format']}")
+        self.message_filter(params.get("filter") or {})
+        for key in ("output", "search_index"):
+            if params.get(key):
+                self.output_path(params[key], params["excel_file"])
+        self.transcriber(params.get("transcribe"))
+        job = Job(params)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._pool.submit(self.run_job, job)
+        return job
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def run_job(self, job):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            if job.params["type"] == "stats":
+                job.result = self.run_stats(job.params)
+            else:
+                job.result = self.run_render(job.params)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        finally:
+            job.finished = time.time()
+            job.done.set()
+            self.prune_jobs()
+
+    def prune_jobs(self):
+        """Verwirft die ältesten abgeschlossenen Aufträge, sobald mehr als `keep_jobs` vorliegen"""
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+            for job_id in finished[:max(0, len(finished) - self.keep_jobs)]:
+                del self.jobs[job_id]
+
+    @staticmethod
+    def message_filter(options):
+        """MessageFilter aus dem Feld "filter" eines Auftrags (Schlüssel wie die Kommandozeilenoptionen)"""
+        from functions import message_filter_from_args, parse_filter_date
+
+        check_fields(options, FILTER_FIELDS, "Filter")
+        if options.get("direction") not in (None, "incoming", "outgoing"):
+            raise ValueError(f"Ungültige Richtung: {options['direction']}")
+        try:
+            return message_filter_from_args(argparse.Namespace(
+                since=parse_filter_date(options["since"]) if options.get("since") else None,
+                until=parse_filter_date(options["until"]) if options.get("until") else None,
+                participant=options.get("participant"),
+                direction=options.get("direction"),
+                starred_only=bool(options.get("starred_only")),
+                exclude_deleted=bool(options.get("exclude_deleted"))
+            ))
+        except argparse.ArgumentTypeError as e:
+            raise ValueError(str(e))
+
+    @staticmethod
+    def transcriber(options):
+        """
+        WhisperTranscriber aus dem Feld "transcribe" eines Auftrags ({"model", "quantize", "threads"}).
+        Geladene Modelle bleiben im Prozess (asr.load_model), Folgeaufträge laden sie nicht erneut.
+        """
+        if not options:
+            return None
+        from asr import WHISPER_MODELS, WhisperTranscriber
+
+        if options is True:
+            options = {}
+        check_fields(options, TRANSCRIBE_FIELDS, "Transkriptionsoptionen")
+        model = options.get("model", "medium")
+        if model not in WHISPER_MODELS:
+            raise ValueError(f"Unbekanntes Whisper-Modell: {model}")
+        return WhisperTranscriber(model, options.get("quantize", "int8"), options.get("threads"))
+
+    def output_path(self, path, excel_file):
+        """
+        Absoluter Ausgabepfad eines Auftrags (relative Pfade gelten ab dem Verzeichnis des Exports).
+        ValueError, wenn er nicht in einem erlaubten Verzeichnis liegt.
+        """
+        export_dir = Path(excel_file).resolve().parent
+        resolved = (export_dir / path).resolve()
+        if not any(resolved.is_relative_to(root) for root in self.output_dirs or [export_dir]):
+            raise ValueError(f"Ausgabepfad außerhalb der erlaubten Verzeichnisse: {path}")
+        return str(resolved)
+
+    def load_chat(self, excel_file, message_filter=None, refresh=False):
+        """Eingelesener ChatExport mit aufgelösten Anhängen, aus dem Cache solange die Datei unverändert ist"""
+        from functions import AttachmentIndex, resolve_attachments
+        from models import get_reader
+        from sqlite_export import is_sqlite_file
+
+        path = str(Path(excel_file).resolve())
+        if refresh:
+            self.indexes.discard(lambda key: key[0] == path)
+            self.chats.discard(lambda key: key[0] == path)
+        mtime = os.stat(path).st_mtime_ns
+
+        def read():
+            chat = get_reader(path).read(path, message_filter)
+            if not is_sqlite_file(path):
+                index = self.indexes.get_or_create((path, mtime), lambda: AttachmentIndex(path, self.scan_workers))
+                resolve_attachments(chat, index=index)
+            return chat
+
+        return self.chats.get_or_create((path, mtime, message_filter), read)
+
+    def run_stats(self, params):
+        from functions import generate_statistics
+
+        chat = self.load_chat(params["excel_file"], self.message_filter(params.get("filter") or {}),
+                              params.get("refresh", False))
+        return {"messages": chat.message_count, "stats": generate_statistics(chat, params.get("verbose", False))}
+
+    def run_render(self, params):
+        from generate_report import REPORT_BACKENDS, generate_chat_report
+
+        report_format = params.get("format", "pdf")
+        if report_format not in REPORT_BACKENDS:
+            raise ValueError(f"Unbekanntes Ausgabeformat: {report_format}")
+        output_file = self.output_path(params.get("output") or f"chat_report{REPORT_BACKENDS[report_format].extension}",
+                                       params["excel_file"])
+        search_index = params.get("search_index")
+        if search_index:
+            search_index = self.output_path(search_index, params["excel_file"])
+        chat = self.load_chat(params["excel_file"], self.message_filter(params.get("filter") or {}),
+                              params.get("refresh", False))
+        written = generate_chat_report(params["excel_file"], output_file, params.get("verbose", False), chat=chat,
+                                       search_index_path=search_index, report_format=report_format,
+                                       thumbnails=params.get("thumbnails", False),
+                                       pages_per_volume=params.get("pages_per_volume"), image_dpi=params.get("image_dpi"),
+                                       prefetch=params.get("prefetch"), resume=params.get("resume", False),
+                                       transcriber=self.transcriber(params.get("transcribe")))
+        return {"messages": chat.message_count, "files": [str(path) for path in written]}
+
+    def status(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "uptime": round(time.time() - self.started, 1),
+            "workers": self.workers,
+            "jobs": counts,
+            "caches": {"attachment_indexes": self.indexes.stats(), "chats": self.chats.stats()},
+            "asr_models": sorted(f"{name}/{precision}" for name, precision in getattr(sys.modules.get("asr"), "_models", {})),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON-API des Report-Servers:
+      GET  /status      Laufzeit, Aufträge je Status, Cache-Statistik
+      GET  /jobs        alle Aufträge
+      GET  /jobs/<id>   ein Auftrag mit Ergebnis
+      POST /jobs        neuen Auftrag einreihen; mit "wait": true erst nach Abschluss antworten
+
+    Damit Webseiten im Browser des Bearbeiters keine Aufträge einreihen können, werden nur Anfragen
+    mit lokalem Host und ohne fremden Origin angenommen, POST nur mit Content-Type application/json
+    (den setzt ein Browser seitenübergreifend nicht ohne CORS-Freigabe, die der Server nie erteilt).
+    """
+    server_version = "ChatReportServer/1.0"
+    LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+    def is_local(self, value):
+        """Ob ein Host- oder Origin-Header auf diesen Rechner zeigt"""
+        host = urlsplit(value if "//" in value else "//" + value).hostname
+        bound = self.server.server_address
+        return host in self.LOCAL_HOSTS or (isinstance(bound, tuple) and host == bound[0])
+
+    def check_request(self):
+        """Sendet 403 und liefert False bei Anfragen, die nicht von diesem Rechner stammen"""
+        host = self.headers.get("Host")
+        origin = self.headers.get("Origin")
+        if (host is not None and not self.is_local(host)) or (origin is not None and not self.is_local(origin)):
+            self.send_json(403, {"error": "Nur lokale Anfragen erlaubt"})
+            return False
+        return True
+
+    def address_string(self):
+        # Über einen Unix-Socket gibt es keine Client-Adresse
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.check_request():
+            return
+        report_server = self.server.report_server
+        if self.path == "/status":
+            self.send_json(200, report_server.status())
+        elif self.path == "/jobs":
+            with report_server._lock:
+                jobs = [job.to_dict() for job in report_server.jobs.values()]
+            self.send_json(200, jobs)
+        elif self.path.startswith("/jobs/"):
+            job = report_server.get_job(self.path[len("/jobs/"):])
+            if job is None:
+                self.send_json(404, {"error": "Auftrag nicht gefunden"})
+            else:
+                self.send_json(200, job.to_dict())
+        else:
+            self.send_json(404, {"error": "Unbekannter Pfad"})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self.send_json(404, {"error": "Unbekannter Pfad"})
+            return
+        if not self.check_request():
+            return
+        if self.headers.get_content_type() != "application/json":
+            self.send_json(415, {"error": "Content-Type muss application/json sein"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("Auftrag muss ein JSON-Objekt sein")
+            job = self.server.report_server.submit(params)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        if params.get("wait"):
+            job.done.wait()
+            self.send_json(200, job.to_dict())
+        else:
+            self.send_json(202, job.to_dict())
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """HTTP über einen Unix-Socket (z.B. curl --unix-socket)"""
+    daemon_threads = True
+
+def create_http_server(report_server, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        httpd = UnixHTTPServer(socket_path, RequestHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        httpd = ThreadingHTTPServer((host, port), RequestHandler)
+        httpd.daemon_threads = True
+    httpd.report_server = report_server
+    return httpd
+
+def main():
+    """
+    Kommandozeile: Report-Server starten
+    """
+    parser = argparse.ArgumentParser(description='Lokaler Report-Server mit vorgeladenen Schriften, Modulen und Anhangsindizes')
+    parser.add_argument('--host', default='127.0.0.1', help='Adresse (Standard: 127.0.0.1, nur lokal erreichbar)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (Standard: {DEFAULT_PORT})')
+    parser.add_argument('--socket', help='Unix-Socket statt TCP verwenden (nur für den eigenen Benutzer zugänglich)')
+    parser.add_argument('--workers', type=int, default=2, help='Anzahl gleichzeitig laufender Aufträge (Standard: 2)')
+    parser.add_argument('--cache-size', type=int, default=8,
+                        help='Anzahl Exporte bzw. Anhangsindizes im Cache (Standard: 8)')
+    parser.add_argument('--scan-workers', type=int, default=8,
+                        help='Threads für das Indizieren der Anhangsverzeichnisse (Standard: 8)')
+    parser.add_argument('--keep-jobs', type=int, default=500, metavar='N',
+                        help='Nur die letzten N abgeschlossenen Aufträge aufbewahren (Standard: 500)')
+    parser.add_argument('--output-dir', action='append', default=None, metavar='DIR',
+                        help='Reports nur in dieses Verzeichnis schreiben, mehrfach angebbar '
+                             '(Standard: Verzeichnis des jeweiligen Exports)')
+    args = parser.parse_args()
+
+    report_server = ReportServer(max(1, args.workers), max(1, args.cache_size), max(1, args.scan_workers),
+                                 args.output_dir, max(1, args.keep_jobs))
+    start = time.perf_counter()
+    report_server.warm_up()
+    print(f"Module und Schriften geladen in {time.perf_counter() - start:.1f}s")
+
+    try:
+        httpd = create_http_server(report_server, args.host, args.port, args.socket)
+    except OSError as e:
+        print(f"Fehler: Server konnte nicht gestartet werden: {e}")
+        sys.exit(1)
+    print(f"Report-Server läuft auf {args.socket or f'http://{args.host}:{args.port}'} "
+          f"({report_server.workers} Worker), Beenden mit Strg+C")
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nReport-Server wird beendet")
+    finally:
+        httpd.server_close()
+        report_server.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+if __name__ == "__main__":
+    main()
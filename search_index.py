@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import sqlite3
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from models import get_reader
+from transcription import attachment_transcription
+
+@dataclass(frozen=True, slots=True)
+class SearchHit:
+    """Ein Treffer der Volltextsuche"""
+    number: Optional[int]
+    sender: str
+    timestamp: str
+    page: Optional[int]
+    snippet: str
+
+def default_index_path(excel_path):
+    """Standardpfad des Suchindex: neben der Excel-Datei, z.B. chat.search.db"""
+    return Path(excel_path).with_suffix('.search.db')
+
+class SearchIndex:
+    """
+    Volltextindex (SQLite FTS5) über Nachrichtentexte und Transkriptionen.
+    Die rowid entspricht der Position der Nachricht in ChatExport.messages.
+    """
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.connection = sqlite3.connect(str(self.db_path))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def build(self, chat, pages=None):
+        """
+        Baut den Index für einen ChatExport neu auf.
+        `pages` ordnet optional der Nachrichtenposition die PDF-Seite zu.
+        """
+        pages = pages or {}
+        with self.connection:
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS messages;
+                DROP TABLE IF EXISTS message_text;
+                CREATE TABLE messages (
+                    id INTEGER PRIMARY KEY,
+                    number INTEGER,
+                    sender TEXT,
+                    timestamp TEXT,
+                    page INTEGER
+                );
+                CREATE VIRTUAL TABLE message_text USING fts5(
+                    body, transcription, tokenize = 'unicode61 remove_diacritics 2'
+                );
+            """)
+            rows = []
+            texts = []
+            for index, msg in enumerate(chat.messages):
+                timestamp = msg.timestamp.strftime('%d.%m.%Y %H:%M:%S') if msg.timestamp else ""
+                rows.append((index, msg.number, msg.sender.name, timestamp, pages.get(index)))
+                texts.append((index, msg.body, attachment_transcription(msg.attachment)))
+            self.connection.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+            self.connection.executemany(
+                "INSERT INTO message_text (rowid, body, transcription) VALUES (?, ?, ?)", texts)
+
+    def update_pages(self, pages):
+        """Trägt die PDF-Seiten nach, nachdem ein Report erzeugt wurde"""
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE messages SET page = ? WHERE id = ?",
+                [(page, index) for index, page in pages.items()])
+
+    def query(self, text, limit=50):
+        """Sucht nach `text` (FTS5-Syntax, bei Syntaxfehlern als Phrase) und liefert SearchHit-Objekte"""
+        sql = """
+            SELECT m.number, m.sender, m.timestamp, m.page,
+                   snippet(message_text, -1, '[', ']', '...', 12)
+            FROM message_text JOIN messages m ON m.id = message_text.rowid
+            WHERE message_text MATCH ?
+            ORDER BY m.id
+            LIMIT ?
+        """
+        try:
+            rows = self.connection.execute(sql, (text, limit)).fetchall()
+        except sqlite3.OperationalError:
+            phrase = '"' + text.replace('"', '""') + '"'
+            rows = self.connection.execute(sql, (phrase, limit)).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+def main():
+    """
+    Kommandozeile: Index aufbauen (build) oder durchsuchen (query)
+    """
+    parser = argparse.ArgumentParser(description='Volltextsuche über Chat-Nachrichten und Transkriptionen')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Suchindex für eine Excel-Datei aufbauen')
+    build_parser.add_argument('excel_file', help='Pfad zur Excel-Datei')
+    build_parser.add_argument('--index', help='Pfad zur Index-Datei (Standard: <excel_file>.search.db)')
+
+    query_parser = subparsers.add_parser('query', help='Suchindex durchsuchen')
+    query_parser.add_argument('excel_file', help='Pfad zur Excel-Datei')
+    query_parser.add_argument('text', help='Suchbegriff (FTS5-Syntax, z.B. "treffen AND morgen")')
+    query_parser.add_argument('--index', help='Pfad zur Index-Datei (Standard: <excel_file>.search.db)')
+    query_parser.add_argument('--limit', type=int, default=50, help='Maximale Anzahl Treffer (Standard: 50)')
+    args = parser.parse_args()
+
+    index_path = Path(args.index) if args.index else default_index_path(args.excel_file)
+
+    if args.command == 'build':
+        from functions import resolve_attachments
+        try:
+            chat = get_reader(args.excel_file).read(args.excel_file)
+        except ValueError:
+            print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
+            sys.exit(1)
+        resolve_attachments(chat)
+        with SearchIndex(index_path) as index:
+            index.build(chat)
+        print(f"Suchindex mit {chat.message_count} Nachrichten erstellt: {index_path}")
+        return
+
+    if not index_path.exists():
+        print(f"Fehler: Kein Suchindex gefunden: {index_path}")
+        print("Erstelle ihn mit: python search_index.py build <excel_file>")
+        sys.exit(1)
+
+    with SearchIndex(index_path) as index:
+        hits = index.query(args.text, args.limit)
+    for hit in hits:
+        number = hit.number if hit.number is not None else "-"
+        page = hit.page if hit.page is not None else "-"
+        print(f"{number:>6} | {hit.sender[:20]:20} | {hit.timestamp:19} | Seite {page:>4} | {hit.snippet}")
+    print(f"{len(hits)} Treffer")
+
+if __name__ == "__main__":
+    main()
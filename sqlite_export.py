@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import itertools
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from models import (Attachment, AttachmentType, ChatExport, ChatExportReader, Direction, Message,
+                    MessageBatch, MessageFilter, MessageStatus, Participant, UNKNOWN_PARTICIPANT, DEFAULT_BATCH_SIZE)
+
+# Dateiendungen, die als SQLite-Zwischenformat erkannt werden
+SQLITE_EXTENSIONS = {'.db', '.sqlite', '.sqlite3'}
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE participants (
+    id INTEGER PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_owner INTEGER NOT NULL,
+    listed INTEGER NOT NULL          -- 0 für Systemnachrichten und unbekannte Absender
+);
+CREATE TABLE messages (
+    id INTEGER PRIMARY KEY,          -- Position im ChatExport
+    number INTEGER,
+    participant_id INTEGER NOT NULL REFERENCES participants(id),
+    body TEXT NOT NULL,
+    timestamp TEXT,                  -- ISO 8601, NULL wenn nicht lesbar
+    status TEXT NOT NULL,
+    direction INTEGER NOT NULL,
+    deleted INTEGER NOT NULL,
+    starred INTEGER NOT NULL
+);
+CREATE TABLE attachments (
+    message_id INTEGER PRIMARY KEY REFERENCES messages(id),
+    filename TEXT NOT NULL,
+    full_path TEXT,
+    type INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    transcription TEXT
+);
+CREATE INDEX messages_participant ON messages(participant_id);
+CREATE INDEX messages_timestamp ON messages(timestamp);
+CREATE INDEX attachments_type ON attachments(type);
+CREATE INDEX attachments_filename ON attachments(filename);
+"""
+
+def is_sqlite_file(file_path):
+    return Path(file_path).suffix.lower() in SQLITE_EXTENSIONS
+
+def export_to_sqlite(chat, db_path):
+    """
+    Schreibt einen ChatExport (Teilnehmer, Nachrichten, aufgelöste Anhänge, Kategorien,
+    Transkriptionen) in eine normalisierte, indizierte SQLite-Datenbank.
+    Alle Daten werden mit executemany in einer einzigen Transaktion geschrieben.
+    """
+    from functions import categorize_attachment
+    from transcription import attachment_transcription
+
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+
+    connection = sqlite3.connect(str(db_path))
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+
+            meta = dict(chat.metadata, excel_path=str(chat.excel_path), attachments_resolved=True)
+            connection.executemany("INSERT INTO meta VALUES (?, ?)",
+                                   [(key, json.dumps(value)) for key, value in meta.items()])
+
+            listed = set(chat.participants)
+            participant_ids = {participant: i for i, participant in enumerate(chat.participants)}
+            message_rows = []
+            attachment_rows = []
+            for index, msg in enumerate(chat.messages):
+                if msg.sender not in participant_ids:
+                    participant_ids[msg.sender] = len(participant_ids)
+                message_rows.append((
+                    index, msg.number, participant_ids[msg.sender], msg.body,
+                    msg.timestamp.isoformat(sep=' ') if msg.timestamp else None,
+                    msg.status, int(msg.direction), msg.deleted, msg.starred
+                ))
+                attachment = msg.attachment
+                if attachment is not None:
+                    attachment_rows.append((
+                        index, attachment.filename,
+                        str(attachment.full_path) if attachment.full_path else None,
+                        int(attachment.type), categorize_attachment(attachment.filename),
+                        attachment_transcription(attachment) or None
+                    ))
+
+            connection.executemany(
+                "INSERT INTO participants VALUES (?, ?, ?, ?, ?)",
+                [(i, p.chat_id, p.name, p.is_owner, p in listed) for p, i in participant_ids.items()])
+            connection.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", message_rows)
+            connection.executemany("INSERT INTO attachments VALUES (?, ?, ?, ?, ?, ?)", attachment_rows)
+    finally:
+        connection.close()
+
+class SqliteChatExportReader(ChatExportReader):
+    """
+    Liest einen mit export_to_sqlite geschriebenen ChatExport wieder ein.
+    Ein MessageFilter wird als WHERE-Bedingung an SQLite übergeben (Zeitraum über den Index auf timestamp).
+    """
+    MESSAGE_QUERY = """
+        SELECT m.id, m.number, m.participant_id, m.body, m.timestamp, m.status, m.direction,
+               m.deleted, m.starred, a.filename, a.full_path, a.type, a.transcription
+        FROM messages m LEFT JOIN attachments a ON a.message_id = m.id
+        {where}
+        ORDER BY m.id
+    """
+
+    def read(self, file_path: Path, message_filter: Optional[MessageFilter] = None) -> ChatExport:
+        try:
+            batches = self.iter_batches(file_path, message_filter=message_filter)
+            first = next(batches)
+            return ChatExport.from_batches(itertools.chain([first], batches), Path(first.metadata["excel_path"]))
+        except sqlite3.Error as e:
+            raise ValueError(f"SQLite-Datenbank konnte nicht gelesen werden: {e}")
+
+    def iter_batches(self, file_path: Path, batch_size: int = DEFAULT_BATCH_SIZE,
+                     message_filter: Optional[MessageFilter] = None) -> Iterator[MessageBatch]:
+        connection = sqlite3.connect(f"file:{Path(file_path)}?mode=ro", uri=True)
+        try:
+            metadata = {key: json.loads(value) for key, value in connection.execute("SELECT key, value FROM meta")}
+            participants = {}
+            listed = []
+            for participant_id, chat_id, name, is_owner, is_listed in connection.execute(
+                    "SELECT id, chat_id, name, is_owner, listed FROM participants ORDER BY id"):
+                if not chat_id:
+                    participants[participant_id] = UNKNOWN_PARTICIPANT
+                    continue
+                participant = Participant(chat_id=sys.intern(chat_id), name=sys.intern(name), is_owner=bool(is_owner))
+                participants[participant_id] = participant
+                if is_listed:
+                    listed.append(participant)
+
+            where, parameters = self._where(message_filter, participants)
+            if message_filter:
+                metadata["filter"] = message_filter.describe()
+            cursor = connection.execute(self.MESSAGE_QUERY.format(where=where), parameters)
+            new_participants = listed
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows and metadata is None:
+                    break
+                messages = [self._message(row, participants) for row in rows]
+                yield MessageBatch(messages, new_participants, metadata)
+                new_participants, metadata = [], None
+                if not rows:
+                    break
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _where(message_filter, participants):
+        """WHERE-Klausel und Parameter für einen MessageFilter (gleiche Semantik wie MessageFilter.matches)"""
+        if not message_filter:
+            return "", []
+        conditions, parameters = [], []
+        if message_filter.since is not None:
+            conditions.append("m.timestamp >= ?")
+            parameters.append(message_filter.since.isoformat(sep=' '))
+        if message_filter.until is not None:
+            conditions.append("m.timestamp < ?")
+            parameters.append(message_filter.until.isoformat(sep=' '))
+        if message_filter.direction is not None:
+            conditions.append("m.direction = ?")
+            parameters.append(int(message_filter.direction))
+        if message_filter.starred_only:
+            conditions.append("m.starred = 1")
+        if message_filter.exclude_deleted:
+            conditions.append("m.deleted = 0")
+        if message_filter.participant:
+            ids = [participant_id for participant_id, participant in participants.items()
+                   if message_filter.matches_participant(participant)]
+            conditions.append(f"m.participant_id IN ({', '.join('?' * len(ids))})" if ids else "0")
+            parameters.extend(ids)
+        return "WHERE " + " AND ".join(conditions), parameters
+
+    @staticmethod
+    def _message(row, participants) -> Message:
+        (_, number, participant_id, body, timestamp, status, direction, deleted, starred,
+         filename, full_path, attachment_type, transcription) = row
+        attachment = None
+        if filename is not None:
+            attachment = Attachment(
+                filename=filename,
+                full_path=Path(full_path) if full_path else None,
+                type=AttachmentType(attachment_type),
+                transcription=transcription
+            )
+        status_code, status_text = MessageStatus.split(status)
+        return Message(
+            sender=participants[participant_id],
+            body=body,
+            timestamp=datetime.fromisoformat(timestamp) if timestamp else None,
+            status_code=status_code,
+            attachment=attachment,
+            number=number,
+            direction=Direction(direction),
+            deleted=bool(deleted),
+            starred=bool(starred),
+            status_text=status_text
+        )
+
+def main():
+    """
+    Kommandozeile: Excel-Export in eine SQLite-Datenbank umwandeln
+    """
+    parser = argparse.ArgumentParser(description='Chat-Export (Excel) in eine SQLite-Datenbank umwandeln')
+    parser.add_argument('excel_file', help='Pfad zur Excel-Datei')
+    parser.add_argument('--output', '-o', help='Pfad zur Datenbank (Standard: <excel_file>.db)')
+    args = parser.parse_args()
+
+    from functions import resolve_attachments
+    from models import ExcelChatExportReader
+
+    try:
+        chat = ExcelChatExportReader().read(args.excel_file)
+    except ValueError:
+        print("Fehler: Die Excel-Datei konnte nicht gelesen werden.")
+        sys.exit(1)
+    resolve_attachments(chat)
+
+    db_path = Path(args.output) if args.output else Path(args.excel_file).with_suffix('.db')
+    export_to_sqlite(chat, db_path)
+    print(f"{chat.message_count} Nachrichten nach {db_path} exportiert")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from models import AttachmentType
+
+# Transkriptionen werden als Textdateien in einem Verzeichnis 'transcriptions'
+# parallel zum 'files'-Verzeichnis zwischengespeichert.
+
+def get_transcription_path(audio_path, create=True):
+    """Get the path for the transcription file."""
+    # Convert audio_path to absolute path
+    abs_audio_path = Path(audio_path).resolve()
+
+    # Get the directory containing the 'files' directory
+    base_dir = abs_audio_path.parent.parent.parent  # Go up from audio file to 'files' directory, then up again to root
+
+    # Create transcriptions directory parallel to 'files'
+    trans_dir = base_dir / 'transcriptions'
+    if create:
+        trans_dir.mkdir(exist_ok=True)
+
+    # Create a filename based on the original audio filename
+    trans_filename = f"{abs_audio_path.stem}.txt"
+    return trans_dir / trans_filename
+
+def load_cached_transcription(trans_path):
+    """Load transcription from cache if it exists."""
+    try:
+        if trans_path.exists():
+            with open(trans_path, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+    except Exception as e:
+        print(f"Error reading cached transcription: {e}")
+    return None
+
+def save_transcription(trans_path, text):
+    """Save transcription to cache."""
+    try:
+        with open(trans_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    except Exception as e:
+        print(f"Error saving transcription: {e}")
+
+# Herkunft einer Transkription, in der Reihenfolge, in der sie versucht werden
+SOURCE_EXPORT = "export"  # Spalte 'Transcript' des PA-Exports
+SOURCE_CACHE = "cache"    # zuvor gespeicherte Transkription im Verzeichnis 'transcriptions'
+SOURCE_ASR = "asr"        # neu erkannt (Whisper)
+
+def resolve_transcription(attachment, transcribe=None):
+    """
+    Liefert (text, quelle) für einen Anhang. Zuerst wird die Transkription aus dem Export
+    verwendet, dann der Cache; nur wenn beides fehlt, wird `transcribe(path)` (ASR) aufgerufen
+    und das Ergebnis im Cache abgelegt. Ohne Ergebnis: (None, None).
+    """
+    from instrumentation import count
+
+    if attachment is None:
+        return None, None
+    if attachment.transcription:
+        count("transcription_export")
+        return attachment.transcription, SOURCE_EXPORT
+    if not attachment.full_path or attachment.type not in (AttachmentType.AUDIO, AttachmentType.VIDEO):
+        return None, None
+
+    cached = load_cached_transcription(get_transcription_path(attachment.full_path, create=False))
+    if cached:
+        count("transcription_cache")
+        return cached, SOURCE_CACHE
+    if transcribe is None:
+        return None, None
+
+    text = transcribe(attachment.full_path)
+    if not text:
+        return None, None
+    count("transcription_asr")
+    save_transcription(get_transcription_path(attachment.full_path), text)
+    return text, SOURCE_ASR
+
+def attachment_transcription(attachment):
+    """Transkription eines Anhangs: aus dem Export oder aus dem Transkriptions-Cache, sonst ''"""
+    text, _ = resolve_transcription(attachment)
+    return text or ""